@@ -1,6 +1,21 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import declarative_base
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime
 from dotenv import load_dotenv
+from app.services import metrics
+import anyio
+import asyncio
+import itertools
+import logging
 import os
+import time
+
+logger = logging.getLogger(__name__)
 
 # 1. .env 파일 로드
 load_dotenv()
@@ -13,11 +28,312 @@ host = os.getenv("DB_HOST")
 port = os.getenv("DB_PORT")
 db_name = os.getenv("DB_NAME")
 
-# 3. URL 조합하기
-SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{user}:{password}@{host}:{port}/{db_name}"
+# 3. URL 조합하기 (DATABASE_URL 이 있으면 그대로 사용 - 로컬 SQLite 벤치마크 등)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{user}:{password}@{host}:{port}/{db_name}"
+
+# 4. 커넥션 풀 / 비동기 모드 설정
+#    DB_ASYNC=true 이면 AsyncEngine(aiomysql / aiosqlite)을 쓰고, 아니면 sync 엔진을 스레드풀에서 돌린다.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+}
+
+
+def _engine_options(url):
+    # 인메모리 SQLite 는 커넥션 하나를 공유하는 전용 풀을 쓰므로 풀 크기 옵션을 받지 않는다.
+    if url.startswith("sqlite") and ":memory:" in url:
+        return {}
+    return dict(POOL_OPTIONS)
+
+
+def _async_url(url):
+    if url.startswith("mysql+pymysql://"):
+        return "mysql+aiomysql://" + url[len("mysql+pymysql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def _register_sqlite_functions(sync_engine):
+    # 로컬 SQLite 에서도 MySQL 용 SQL(NOW())이 그대로 동작하도록 함수 등록
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, _):
+        dbapi_connection.create_function("NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+_query_counter = ContextVar("query_counter", default=None)
+
+
+@contextmanager
+def count_queries():
+    """블록 안(같은 요청 컨텍스트)에서 실행된 SQL 문 개수를 센다."""
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
+def _on_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.count += 1
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics.observe_query(statement, time.perf_counter() - context._query_started)
+
+
+def _register_hooks(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _on_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _register_sqlite_functions(sync_engine)
+
+
+def _create_engines(url, async_url=None):
+    sync_engine = create_engine(url, **_engine_options(url))
+    _register_hooks(sync_engine)
+    if not DB_ASYNC:
+        return sync_engine, None
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine_async = create_async_engine(async_url or _async_url(url), **_engine_options(url))
+    _register_hooks(engine_async.sync_engine)
+    return sync_engine, engine_async
+
+
+engine, async_engine = _create_engines(SQLALCHEMY_DATABASE_URL, os.getenv("ASYNC_DATABASE_URL"))
+
+Base = declarative_base()
+
+
+class SyncConnection:
+    """sync Connection 을 AsyncConnection 과 같은 인터페이스(await execute/commit)로 감싼다."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def execute(self, statement, parameters=None):
+        return await run_in_threadpool(self.connection.execute, statement, parameters)
+
+    async def stream(self, statement, parameters=None):
+        # 서버 사이드 커서로 실행하고, 행은 fetchmany 단위로 스레드풀에서 가져온다.
+        connection = self.connection.execution_options(stream_results=True)
+        result = await run_in_threadpool(connection.execute, statement, parameters)
+        return SyncStreamResult(result)
+
+    async def commit(self):
+        await run_in_threadpool(self.connection.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.connection.rollback)
+
+
+class SyncStreamResult:
+    def __init__(self, result, chunk_size=500):
+        self.result = result
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self):
+        try:
+            while True:
+                rows = await run_in_threadpool(self.result.fetchmany, self.chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(self.result.close)
+
+
+def _checkout(sync_engine):
+    # 스레드풀 대기 시간은 빼고 풀에서 커넥션을 받는 데 걸린 시간만 잰다.
+    started = time.perf_counter()
+    connection = sync_engine.connect()
+    metrics.observe_pool_wait(time.perf_counter() - started)
+    return connection
+
+
+@asynccontextmanager
+async def connect(replica=None):
+    """primary(기본) 또는 주어진 replica 의 커넥션을 연다."""
+    sync_engine, engine_async = (engine, async_engine) if replica is None else (replica.engine, replica.async_engine)
+    # 스트리밍 응답이 클라이언트 연결 종료로 취소되면 그 안의 await 도 모두 취소되므로, 반납은 취소에서 보호한다.
+    if engine_async is not None:
+        started = time.perf_counter()
+        connection = await engine_async.connect().start()
+        metrics.observe_pool_wait(time.perf_counter() - started)
+        try:
+            yield connection
+        finally:
+            with anyio.CancelScope(shield=True):
+                await connection.close()
+    else:
+        connection = await run_in_threadpool(_checkout, sync_engine)
+        try:
+            yield SyncConnection(connection)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(connection.close)
+
+
+# --- 읽기 전용 replica ---
+# DB_REPLICA_URLS=url1,url2 로 지정한다. 비어 있으면 모든 요청이 primary 를 쓴다.
+REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+# 쓰기 요청 직후 이 시간(초) 동안은 같은 클라이언트의 읽기도 primary 로 보낸다 (복제 지연 동안 자기 글이 안 보이는 문제 방지).
+STICKY_PRIMARY_SECONDS = int(os.getenv("DB_STICKY_PRIMARY_SECONDS", "5"))
+STICKY_COOKIE = "db_primary_until"
+
+
+class Replica:
+    def __init__(self, url):
+        self.url = url
+        self.engine, self.async_engine = _create_engines(url)
+        self.healthy = True
+
+    def check(self):
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+
+class ReplicaSet:
+    """replica 들을 돌아가며 고르고, 헬스 체크에 실패한 replica 는 다시 성공할 때까지 뺀다.
+
+    건강한 replica 가 하나도 없으면 pick() 이 None 을 돌려주고 읽기는 primary 로 간다.
+    """
+
+    def __init__(self, urls, check_interval):
+        self.replicas = [Replica(url) for url in urls]
+        self.check_interval = check_interval
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.failovers = 0
+        self._cycle = itertools.cycle(self.replicas)
+        self._task = None
+
+    def pick(self):
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            if replica.healthy:
+                return replica
+        return None
+
+    def mark_down(self, replica):
+        if replica.healthy:
+            logger.warning("replica 연결 실패, primary 로 전환: %s", replica.engine.url)
+        replica.healthy = False
+        self.failovers += 1
+
+    async def check_all(self):
+        for replica in self.replicas:
+            try:
+                await run_in_threadpool(replica.check)
+            except Exception:
+                if replica.healthy:
+                    self.mark_down(replica)
+                continue
+            if not replica.healthy:
+                logger.info("replica 복구: %s", replica.engine.url)
+            replica.healthy = True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check_all()
+
+    def start(self):
+        if self._task is None and self.replicas and self.check_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "replicas": len(self.replicas),
+            "healthy": sum(replica.healthy for replica in self.replicas),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "failovers": self.failovers,
+        }
+
+
+replicas = ReplicaSet(REPLICA_URLS, check_interval=float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5")))
+metrics.register_stats("db_replicas", replicas.stats)
+
+
+def sticky_until():
+    return str(int(time.time()) + STICKY_PRIMARY_SECONDS)
+
+
+def sticky_to_primary(request):
+    until = request.cookies.get(STICKY_COOKIE)
+    return until is not None and until.isdigit() and int(until) > time.time()
+
+
+async def get_db():
+    async with connect() as connection:
+        yield connection
+
+
+@asynccontextmanager
+async def connect_read(request):
+    """읽기용 커넥션. replica 가 있으면 replica 커넥션을, 최근에 쓴 클라이언트거나 replica 가 모두 죽었으면 primary 를 준다.
+
+    request.state.db_replica 가 True 이면 세션 조회처럼 최신 값이 필요한 읽기는 primary 를 따로 써야 한다.
+    """
+    replica = None if not replicas.replicas or sticky_to_primary(request) else replicas.pick()
+    if replica is not None:
+        opened = False
+        try:
+            async with connect(replica) as connection:
+                opened = True
+                replicas.replica_reads += 1
+                request.state.db_replica = True
+                yield connection
+            return
+        except OperationalError:
+            # 커넥션을 얻는 단계에서 실패한 경우만 primary 로 넘긴다. 쿼리 도중 실패는 그대로 에러.
+            if opened:
+                raise
+            replicas.mark_down(replica)
+    replicas.primary_reads += 1
+    async with connect() as connection:
+        yield connection
+
+
+async def get_read_db(request: Request):
+    """GET 라우트용 의존성 (connect_read). 응답이 끝날 때까지 커넥션을 잡으므로 스트리밍 응답에는 쓰지 않는다."""
+    async with connect_read(request) as connection:
+        yield connection
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-def get_db():
-    with engine.connect() as connection:
-        yield connection
\ No newline at end of file
+async def dispose():
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+    for replica in replicas.replicas:
+        if replica.async_engine is not None:
+            await replica.async_engine.dispose()
+        replica.engine.dispose()
@@ -3,10 +3,58 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers.routes import router
+from app.db import dispose, count_queries, replicas, STICKY_COOKIE, STICKY_PRIMARY_SECONDS, sticky_until
+from app.services.passwords import password_hasher
+from app.services.view_buffer import view_buffer
+from app.services.sessions import session_sweeper
+from app.services.events import post_events
+from app.services.popular import popular_posts
+from app.services.email_filter import email_filter
+from app.services.search import post_search
+from app.services.controllers import rebuild_popular_posts
+from app.services import images, metrics
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
 import os
+import time
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    view_buffer.start()
+    session_sweeper.start()
+    replicas.start()
+    await rebuild_popular_posts()
+    popular_posts.start(rebuild_popular_posts)
+    await email_filter.load()
+    email_filter.start()
+    await post_search.build()
+    post_search.start()
+    yield
+    post_events.close()
+    await session_sweeper.stop()
+    await replicas.stop()
+    await popular_posts.stop()
+    await email_filter.stop()
+    await post_search.stop()
+    await view_buffer.stop()
+    password_hasher.shutdown()
+    images.shutdown()
+    await dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# 이미지 업로드(multipart) 본문이 크기 제한보다 확실히 크면 파싱 전에 거절한다. 다른 요청은 건드리지 않는다.
+# 나중에 등록한 미들웨어가 바깥쪽이므로 CORSMiddleware 보다 먼저 등록해 413 응답에도 CORS 헤더가 붙게 한다.
+@app.middleware("http")
+async def reject_oversized_upload(request: Request, call_next):
+    content_type = request.headers.get("content-type", "")
+    content_length = request.headers.get("content-length")
+    if (content_type.startswith("multipart/form-data") and content_length and content_length.isdigit()
+            and int(content_length) > images.MAX_UPLOAD_BYTES + 64 * 1024):
+        return JSONResponse(status_code=413, content={"detail": "이미지 파일이 너무 큽니다."})
+    return await call_next(request)
 
 origins = [
     "127.0.0.1:5500",
@@ -21,9 +69,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 app.include_router(router)
 
+# 요청마다 라우트 템플릿별 지연시간과 SQL 개수를 기록한다 (/metrics).
+# 개발/벤치마크용으로 QUERY_COUNT_HEADER=true 이면 SQL 개수를 X-Query-Count 헤더로도 내려준다.
+QUERY_COUNT_HEADER = os.getenv("QUERY_COUNT_HEADER", "false").lower() in ("1", "true", "yes")
+
+# call_next 는 응답 헤더가 나오면 돌아오므로 StreamingResponse(NDJSON 댓글, SSE) 본문은 그 뒤에 만들어진다.
+# 하위 앱은 이 컨텍스트를 복사한 태스크에서 돌기 때문에 본문의 SQL 도 같은 counter 에 세어지고,
+# 지연시간/쿼리 수는 본문을 다 보내거나 클라이언트가 끊은 뒤에 기록한다 (SSE 는 스트림이 열려 있던 시간).
+# X-Query-Count 헤더는 본문보다 먼저 나가므로 스트리밍 응답에서는 첫 바이트 전까지의 SQL 만 담긴다.
+@app.middleware("http")
+async def instrument_request(request: Request, call_next):
+    started = time.perf_counter()
+    with count_queries() as counter, metrics.track_request(request.scope) as info:
+        response = await call_next(request)
+    if QUERY_COUNT_HEADER:
+        response.headers["X-Query-Count"] = str(counter.count)
+    body = response.body_iterator
+
+    async def observed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            metrics.observe_request(info, request.method, response.status_code, time.perf_counter() - started,
+                                    counter.count)
+
+    response.body_iterator = observed_body()
+    return response
+
+# replica 를 쓸 때: 쓰기에 성공한 클라이언트는 잠시 동안 읽기도 primary 에서 하도록 쿠키로 표시한다.
+# 세션 쿠키와 같이 클라이언트를 따라다니므로 어느 워커가 다음 요청을 받아도 자기 쓰기 결과를 본다.
+@app.middleware("http")
+async def stick_to_primary_after_write(request: Request, call_next):
+    response = await call_next(request)
+    if replicas.replicas and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        response.set_cookie(key=STICKY_COOKIE, value=sticky_until(), max_age=STICKY_PRIMARY_SECONDS,
+                            httponly=True, samesite="Lax", secure=False)
+    return response
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     return JSONResponse(
@@ -35,7 +122,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         },
     )
 
-os.makedirs("static/images", exist_ok=True)
+os.makedirs(images.IMAGE_DIR, exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 @app.get("/")
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP
+from sqlalchemy import Column, Index, Integer, String, Text, TIMESTAMP, UniqueConstraint
 from sqlalchemy.sql import func
 from app.db import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (UniqueConstraint("email", name="uq_users_email"),)
 
     id = Column(Integer, primary_key=True, index=True)
     nickname = Column(String(10), nullable=False)
@@ -19,6 +20,7 @@ class User(Base):
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (Index("ix_posts_deleted_id", "deleted_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
@@ -26,9 +28,9 @@ class Post(Base):
     image_url = Column(String(255), nullable=False)
     contents = Column(Text)
 
-    views_count = Column(Integer, default=0)
-    likes_count = Column(Integer, default=0)
-    comments_count = Column("comments_count", Integer, default=0)
+    views_count = Column(Integer, default=0, server_default="0")
+    likes_count = Column(Integer, default=0, server_default="0")
+    comments_count = Column("comments_count", Integer, default=0, server_default="0")
 
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, nullable=True)
@@ -37,6 +39,11 @@ class Post(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_post_deleted_id", "post_id", "deleted_at", "id"),
+        Index("ix_comments_deleted_at", "deleted_at"),
+        Index("ix_comments_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, nullable=False)
@@ -49,6 +56,11 @@ class Comment(Base):
 
 class Likes(Base):
     __tablename__ = "likes"
+    __table_args__ = (
+        UniqueConstraint("user_id", "post_id", name="uq_likes_user_post"),
+        Index("ix_likes_post_id", "post_id"),
+        Index("ix_likes_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
@@ -60,6 +72,11 @@ class Likes(Base):
 
 class Views(Base):
     __tablename__ = "views"
+    __table_args__ = (
+        UniqueConstraint("user_id", "post_id", name="uq_views_user_post"),
+        Index("ix_views_post_id", "post_id"),
+        Index("ix_views_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
@@ -71,7 +88,78 @@ class Views(Base):
 
 class SessionData(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        Index("ix_sessions_expires", "expires"),
+        Index("ix_sessions_user_expires", "user_id", "expires"),
+    )
 
     session_id = Column(String(128), primary_key=True)
     expires = Column(Integer, nullable=False)
-    data = Column(Text, nullable=True)
\ No newline at end of file
+    data = Column(Text, nullable=True)
+    user_id = Column(Integer, nullable=True)
+
+
+class CounterWatermark(Base):
+    """scripts/reconcile_counters.py 증분 모드가 마지막으로 성공한 시각."""
+    __tablename__ = "counter_watermarks"
+
+    name = Column(String(64), primary_key=True)
+    last_run_at = Column(TIMESTAMP, nullable=True)
+
+
+# --- 보관(archive) 테이블: 보관 기간이 지난 soft delete 행을 scripts/archive_deleted.py 가 옮겨 둔다 ---
+
+class PostArchive(Base):
+    __tablename__ = "posts_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    title = Column(String(26), nullable=False)
+    image_url = Column(String(255), nullable=False)
+    contents = Column(Text)
+
+    views_count = Column(Integer, default=0, server_default="0")
+    likes_count = Column(Integer, default=0, server_default="0")
+    comments_count = Column("comments_count", Integer, default=0, server_default="0")
+
+    created_at = Column(TIMESTAMP, nullable=True)
+    updated_at = Column(TIMESTAMP, nullable=True)
+    deleted_at = Column(TIMESTAMP, nullable=True)
+    archived_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class CommentArchive(Base):
+    __tablename__ = "comments_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    post_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    content = Column(String(300), nullable=False)
+    created_at = Column(TIMESTAMP, nullable=True)
+    updated_at = Column(TIMESTAMP, nullable=True)
+    deleted_at = Column(TIMESTAMP, nullable=True)
+    archived_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class LikesArchive(Base):
+    __tablename__ = "likes_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    post_id = Column(Integer, nullable=False, index=True)
+    created_at = Column(TIMESTAMP, nullable=True)
+    updated_at = Column(TIMESTAMP, nullable=True)
+    deleted_at = Column(TIMESTAMP, nullable=True)
+    archived_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class ViewsArchive(Base):
+    __tablename__ = "views_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    post_id = Column(Integer, nullable=False, index=True)
+    created_at = Column(TIMESTAMP, nullable=True)
+    updated_at = Column(TIMESTAMP, nullable=True)
+    deleted_at = Column(TIMESTAMP, nullable=True)
+    archived_at = Column(TIMESTAMP, server_default=func.now())
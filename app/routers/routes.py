@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, Request, Form, UploadFile, File, Response
 from sqlalchemy.orm import Session
-from typing import Optional
-from app.db import get_db
-from app.services import controllers
+from typing import List, Optional
+from app.db import connect_read, get_db, get_read_db
+from app.services import controllers, images
+from app.services.ratelimit import RateLimiter, email_key
+from app.services.serialization import FastJSONResponse
 from pydantic import BaseModel
+import os
 
 router = APIRouter()
 
@@ -22,67 +25,141 @@ class NicknameRequest(BaseModel):
     nickname: str
 
 
+# --- 응답 스키마 (문서용. 목록/상세/댓글은 컨트롤러가 FastJSONResponse 로 바로 직렬화한다) ---
+class PostSummary(BaseModel):
+    post_id: int
+    title: str
+    likes: int
+    comments: int
+    views: int
+    created_at: Optional[str]
+    image_thumbnail: Optional[str]
+    author_nickname: str
+    author_profile_image: Optional[str]
+
+class PostListResponse(BaseModel):
+    posts: List[PostSummary]
+    next_cursor: Optional[str]
+
+class PopularPostsResponse(BaseModel):
+    posts: List[PostSummary]
+
+class PostDetailResponse(BaseModel):
+    post_id: int
+    title: str
+    content: Optional[str]
+    image: Optional[str]
+    likes_count: int
+    views_count: int
+    comments_count: int
+    created_at: Optional[str]
+    author_nickname: str
+    author_profile_image: Optional[str]
+    is_owner: bool
+    is_liked: bool
+
+class CommentItem(BaseModel):
+    comment_id: int
+    content: str
+    created_at: Optional[str]
+    author_nickname: str
+    author_profile_image: Optional[str]
+    is_owner: bool
+
+
+# --- 요청 제한 (bcrypt / 매 키 입력마다 DB 조회하는 경로). "횟수/second|minute|hour", 환경변수로 덮어쓸 수 있다 ---
+signup_ip_limit = RateLimiter("signup_ip", os.getenv("RATE_LIMIT_SIGNUP_IP", "10/minute"))
+signup_email_limit = RateLimiter("signup_email", os.getenv("RATE_LIMIT_SIGNUP_EMAIL", "5/hour"))
+login_ip_limit = RateLimiter("login_ip", os.getenv("RATE_LIMIT_LOGIN_IP", "30/minute"))
+login_email_limit = RateLimiter("login_email", os.getenv("RATE_LIMIT_LOGIN_EMAIL", "10/minute"))
+email_check_ip_limit = RateLimiter("email_check_ip", os.getenv("RATE_LIMIT_EMAIL_CHECK_IP", "120/minute"))
+
+
 # --- Routes ---
-@router.post("/users/signup", status_code=201)
-def signup(
+# 조회(GET) 라우트는 get_read_db 로 replica 를 쓴다 (DB_REPLICA_URLS 가 없으면 primary). 쓰기 직후에는 primary 로 고정된다.
+async def signup(
     email: str = Form(...),
     password: str = Form(...),
     nickname: str = Form(...),
     profile_image: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db)
 ):
-    return controllers.signup_controller(email, password, nickname, profile_image, db)
+    return await controllers.signup_controller(email, password, nickname, profile_image, db)
+
+# 이메일별 제한은 본문을 읽는 도중 email 파트가 도착하면 검사한다. 제한에 걸리면 뒤따르는 프로필 이미지를 받지 않는다.
+router.add_api_route("/users/signup", signup, methods=["POST"], status_code=201,
+                     dependencies=[Depends(signup_ip_limit.by_ip())],
+                     route_class_override=signup_email_limit.by_form_field("email", email_key))
 
-@router.post("/users/login")
-def login(req: UserLoginRequest, response: Response, db: Session = Depends(get_db)):
-    return controllers.login_controller(req.email, req.password, response, db)
+@router.post("/users/login", dependencies=[Depends(login_ip_limit.by_ip())])
+async def login(req: UserLoginRequest, response: Response, db: Session = Depends(get_db)):
+    login_email_limit.check(email_key(req.email))
+    return await controllers.login_controller(req.email, req.password, response, db)
 
 @router.post("/users/logout")
-def logout(request: Request, response: Response, db: Session = Depends(get_db)):
-    return controllers.logout_controller(request, response, db)
+async def logout(request: Request, response: Response, db: Session = Depends(get_db)):
+    return await controllers.logout_controller(request, response, db)
 
 @router.get("/users/me")
-def get_me(request: Request, db: Session = Depends(get_db)):
-    return controllers.get_me_controller(request, db)
+async def get_me(request: Request, db: Session = Depends(get_db)):
+    return await controllers.get_me_controller(request, db)
 
-@router.get("/users/email")
-def check_email(email: str, db: Session = Depends(get_db)):
-    return controllers.check_email_controller(email, db)
+@router.get("/users/email", dependencies=[Depends(email_check_ip_limit.by_ip())])
+async def check_email(email: str, db: Session = Depends(get_read_db)):
+    return await controllers.check_email_controller(email, db)
 
 @router.patch("/users/{user_id}")
-def update_nickname(user_id: int, req: NicknameRequest, request: Request, db: Session = Depends(get_db)):
-    return controllers.update_nickname_controller(user_id, req.nickname, request, db)
+async def update_nickname(user_id: int, req: NicknameRequest, request: Request, db: Session = Depends(get_db)):
+    return await controllers.update_nickname_controller(user_id, req.nickname, request, db)
 
 @router.put("/users/me/password")
-def update_password(req: PasswordRequest, request: Request, db: Session = Depends(get_db)):
-    return controllers.update_password_controller(req.password, request, db)
+async def update_password(req: PasswordRequest, request: Request, db: Session = Depends(get_db)):
+    return await controllers.update_password_controller(req.password, request, db)
 
 @router.delete("/users/me")
-def delete_user(request: Request, response: Response, db: Session = Depends(get_db)):
-    return controllers.delete_user_controller(request, response, db)
+async def delete_user(request: Request, response: Response, db: Session = Depends(get_db)):
+    return await controllers.delete_user_controller(request, response, db)
+
+@router.get("/stats/session-cache")
+async def session_cache_stats():
+    return controllers.session_cache_stats_controller()
+
+@router.get("/metrics")
+async def get_metrics():
+    return controllers.metrics_controller()
 
 # --- Posts ---
 
-@router.get("/posts")
-def get_posts(offset: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return controllers.get_posts_list_controller(offset, limit, db)
+@router.get("/posts", response_model=PostListResponse, response_class=FastJSONResponse)
+async def get_posts(request: Request, offset: int = 0, limit: int = 10, cursor: Optional[str] = None,
+                    db: Session = Depends(get_read_db)):
+    return await controllers.get_posts_list_controller(offset, limit, request, db, cursor)
 
 @router.post("/api/posts", status_code=201) # 프론트 경로 맞춤
-def create_post(
+async def create_post(
     request: Request,
     title: str = Form(...),
     content: str = Form(...),
     image: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db)
 ):
-    return controllers.create_post_controller(title, content, image, request, db)
+    return await controllers.create_post_controller(title, content, image, request, db)
 
-@router.get("/posts/{post_id}")
-def get_post_detail(post_id: int, request: Request, db: Session = Depends(get_db)):
-    return controllers.get_post_detail_controller(post_id, request, db)
+# /posts/{post_id} 보다 먼저 선언해야 "popular", "search" 가 post_id 로 잡히지 않는다.
+@router.get("/posts/popular", response_model=PopularPostsResponse, response_class=FastJSONResponse)
+async def get_popular_posts(limit: int = 10):
+    return await controllers.get_popular_posts_controller(limit)
+
+@router.get("/posts/search", response_model=PostListResponse, response_class=FastJSONResponse)
+async def search_posts(q: str, limit: int = 10, cursor: Optional[str] = None, db: Session = Depends(get_read_db)):
+    return await controllers.search_posts_controller(q, limit, db, cursor)
+
+@router.get("/posts/{post_id}", response_model=PostDetailResponse, response_class=FastJSONResponse)
+async def get_post_detail(post_id: int, request: Request, db: Session = Depends(get_read_db)):
+    return await controllers.get_post_detail_controller(post_id, request, db)
 
 @router.put("/api/posts/{post_id}") # 프론트 경로 맞춤
-def update_post(
+async def update_post(
     post_id: int,
     request: Request,
     title: str = Form(...),
@@ -90,30 +167,53 @@ def update_post(
     image: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db)
 ):
-    return controllers.update_post_controller(post_id, title, content, image, request, db)
+    return await controllers.update_post_controller(post_id, title, content, image, request, db)
 
 @router.delete("/posts/{post_id}")
-def delete_post(post_id: int, request: Request, db: Session = Depends(get_db)):
-    return controllers.delete_post_controller(post_id, request, db)
+async def delete_post(post_id: int, request: Request, db: Session = Depends(get_db)):
+    return await controllers.delete_post_controller(post_id, request, db)
 
 @router.post("/posts/{post_id}/like")
-def like_post(post_id: int, request: Request, db: Session = Depends(get_db)):
-    return controllers.like_post_controller(post_id, request, db)
+async def like_post(post_id: int, request: Request, db: Session = Depends(get_db)):
+    return await controllers.like_post_controller(post_id, request, db)
 
 # --- Comments ---
 
-@router.get("/posts/{post_id}/comments")
-def get_comments(post_id: int, request: Request, db: Session = Depends(get_db)):
-    return controllers.get_comments_controller(post_id, request, db)
+@router.get("/posts/{post_id}/comments", response_model=List[CommentItem], response_class=FastJSONResponse)
+async def get_comments(
+    post_id: int,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = controllers.COMMENTS_PAGE_SIZE,
+    stream: bool = False,
+):
+    # stream=true 이면 커서 이후의 댓글 전체를 NDJSON 으로 흘려보낸다.
+    # 요청 스코프 DB 의존성은 응답이 끝날 때까지 커넥션을 잡으므로, 스트림은 생성기 안에서만 커넥션을 연다.
+    if stream:
+        return await controllers.stream_comments_controller(post_id, request, cursor)
+    async with connect_read(request) as db:
+        return await controllers.get_comments_controller(post_id, request, db, cursor, limit)
+
+@router.get("/posts/{post_id}/events")
+async def post_events(post_id: int):
+    # 좋아요/댓글/조회 수 변경을 Server-Sent Events 로 받는다 (폴링 대신).
+    # 요청 스코프 DB 의존성은 응답이 끝날 때까지 커넥션을 잡고 있으므로 쓰지 않는다.
+    return await controllers.post_events_controller(post_id)
 
 @router.post("/posts/{post_id}/comments")
-def create_comment(post_id: int, req: CommentRequest, request: Request, db: Session = Depends(get_db)):
-    return controllers.create_comment_controller(post_id, req.content, request, db)
+async def create_comment(post_id: int, req: CommentRequest, request: Request, db: Session = Depends(get_db)):
+    return await controllers.create_comment_controller(post_id, req.content, request, db)
 
 @router.put("/comments/{comment_id}")
-def update_comment(comment_id: int, req: CommentRequest, request: Request, db: Session = Depends(get_db)):
-    return controllers.update_comment_controller(comment_id, req.content, request, db)
+async def update_comment(comment_id: int, req: CommentRequest, request: Request, db: Session = Depends(get_db)):
+    return await controllers.update_comment_controller(comment_id, req.content, request, db)
 
 @router.delete("/comments/{comment_id}")
-def delete_comment(comment_id: int, request: Request, db: Session = Depends(get_db)):
-    return controllers.delete_comment_controller(comment_id, request, db)
\ No newline at end of file
+async def delete_comment(comment_id: int, request: Request, db: Session = Depends(get_db)):
+    return await controllers.delete_comment_controller(comment_id, request, db)
+
+# --- Images ---
+
+@router.api_route("/static/images/{image_path:path}", methods=["GET", "HEAD"])
+async def get_image(image_path: str, request: Request):
+    return await images.serve_image(image_path, request)
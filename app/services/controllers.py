@@ -1,363 +1,742 @@
-from fastapi import HTTPException, UploadFile
-from sqlalchemy import text
-import bcrypt
+from fastapi import HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.db import connect, sticky_to_primary
+from app.services import metrics, responses, sessions
+from app.services.cache import TTLCache
+from app.services.email_filter import email_filter
+from app.services.events import post_events
+from app.services.images import save_image, thumbnail_url
+from app.services.passwords import password_hasher
+from app.services.popular import popular_posts
+from app.services.responses import ClosingStreamingResponse, json_response, weak_etag
+from app.services.search import grams, post_search
+from app.services.serialization import FastJSONResponse, dumps
+from app.services.view_buffer import view_buffer
+import base64
+import heapq
 import os
+import time
 import uuid
-import shutil
+from datetime import datetime
 
-ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif'}
+LIKE_TOGGLE_RETRIES = 3
+COMMENTS_PAGE_SIZE = 50
+MAX_COMMENTS_PAGE_SIZE = 100
 
-def save_image(file: UploadFile) -> str:
-    if not file or not file.filename:
-        return ""
-    ext = os.path.splitext(file.filename)[1].lower()
+# session_id -> (user_id, expires). 다른 워커에서 로그아웃된 세션은 TTL 동안 살아있을 수 있으므로 TTL 은 짧게 유지한다.
+session_cache = TTLCache(
+    maxsize=int(os.getenv("SESSION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("SESSION_CACHE_TTL", "60")),
+)
 
-    if ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(status_code=400, detail="이미지 파일(png, jpg,gif,jpeg)만 업로드 가능합니다.")
+# (읽은 곳 primary/replica, offset, limit) -> (직렬화된 게시글 목록 JSON, ETag, 압축 본문).
+# 글/작성자 정보가 바뀌면 즉시 비우고, 좋아요/댓글/조회수 카운터는 TTL 동안 조금 늦게 반영되는 것을 허용한다.
+posts_page_cache = TTLCache(
+    maxsize=int(os.getenv("POSTS_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("POSTS_CACHE_TTL", "5")),
+)
+POSTS_MAX_LIMIT = 50
+# 캐시는 앞쪽 몇 페이지(offset 이 limit 의 배수인 페이지)만 담는다. 임의의 offset/cursor 로 캐시를 밀어내지 못하게.
+POSTS_CACHE_PAGES = int(os.getenv("POSTS_CACHE_PAGES", "5"))
 
-    filename = f"{uuid.uuid4()}_{file.filename}"
-    file_path = f"static/images/{filename}"
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return f"/static/images/{filename}"
 
+metrics.register_stats("session_cache", session_cache.stats)
+metrics.register_stats("posts_page_cache", posts_page_cache.stats)
+metrics.register_stats("sse", post_events.stats)
+metrics.register_stats("popular_posts", popular_posts.stats)
+metrics.register_stats("email_filter", email_filter.stats)
+metrics.register_stats("search", post_search.stats)
+metrics.register_stats("json_responses", responses.stats)
+
+
+def invalidate_posts_cache():
+    posts_page_cache.clear()
+
+
+async def get_current_user_id(request, db):
+    # 한 요청 안에서는 세션을 한 번만 확인한다.
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is not None:
+        return user_id
 
-def get_current_user_id(request, db):
     session_id = request.cookies.get("session_id")
     if not session_id:
         raise HTTPException(status_code=401, detail="로그인이 필요합니다.")
 
-    sql = text("SELECT data FROM sessions WHERE session_id = :session_id")
-    result = db.execute(sql, {"session_id": session_id}).fetchone()
+    cached = session_cache.get(session_id)
+    if cached is None or cached[1] <= sessions.now() or sessions.needs_renewal(cached[1]):
+        if getattr(request.state, "db_replica", False):
+            # 세션 조회/연장은 primary 에서 한다 (방금 만든 세션이 아직 replica 에 없을 수 있고, 연장은 쓰기다).
+            async with connect() as primary:
+                cached = await _load_session(session_id, cached, primary)
+        else:
+            cached = await _load_session(session_id, cached, db)
+    request.state.user_id = cached[0]
+    return cached[0]
+
+
+async def _load_session(session_id, cached, db):
+    if cached is not None and cached[1] > sessions.now():
+        user_id, expires = cached
+    else:
+        sql = text("SELECT data, expires FROM sessions WHERE session_id = :session_id AND expires > :now")
+        result = (await db.execute(sql, {"session_id": session_id, "now": sessions.now()})).fetchone()
+        if not result:
+            session_cache.pop(session_id)
+            raise HTTPException(status_code=401, detail="세션이 만료되었습니다.")
+        user_id, expires = int(result.data), result.expires
+
+    # sliding 만료: 남은 시간이 절반 아래로 떨어졌을 때만 연장한다.
+    if sessions.needs_renewal(expires):
+        expires = sessions.new_expiry()
+        await db.execute(text("UPDATE sessions SET expires = :expires WHERE session_id = :session_id"),
+                         {"expires": expires, "session_id": session_id})
+        await db.commit()
+    session_cache.set(session_id, (user_id, expires))
+    return user_id, expires
+
 
-    if not result:
-        raise HTTPException(status_code=401, detail="세션이 만료되었습니다.")
+def session_cache_stats_controller():
+    return session_cache.stats()
 
-    return int(result.data)
+
+def metrics_controller():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 # 1. 회원가입
-def signup_controller(email, password, nickname, profile_image, db):
-    # 이메일 중복 확인
-    if db.execute(text("SELECT id FROM users WHERE email = :email"), {"email": email}).fetchone():
+async def signup_controller(email, password, nickname, profile_image, db):
+    # 이메일 중복 확인 (Bloom filter 가 "없음" 이라고 하면 DB 를 건너뛴다)
+    if await _email_exists(email, db):
         raise HTTPException(status_code=409, detail="이미 존재하는 이메일입니다.")
 
-    password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
-    image_url = save_image(profile_image)
+    hashed_password = await password_hasher.hash(password)
+    image_url = await save_image(profile_image)
 
     insert_sql = text("""
                       INSERT INTO users (email, password, nickname, image_url, created_at)
                       VALUES (:email, :password, :nickname, :image_url, NOW())
                       """)
-    db.execute(insert_sql, {
-        "email": email, "password": hashed_password, "nickname": nickname, "image_url": image_url
-    })
-    db.commit()
+    try:
+        await db.execute(insert_sql, {
+            "email": email, "password": hashed_password, "nickname": nickname, "image_url": image_url
+        })
+    except IntegrityError:
+        # 다른 워커에서 방금 가입해 아직 이 워커의 필터에 없거나, 동시에 같은 이메일로 가입한 경우
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="이미 존재하는 이메일입니다.")
+    await db.commit()
+    email_filter.add(email)
+    invalidate_posts_cache()
     return {"message": "회원가입 성공"}
 
 
+async def _email_exists(email, db):
+    if not email_filter.might_exist(email):
+        return False
+    found = (await db.execute(text("SELECT id FROM users WHERE email = :email"),
+                              {"email": email})).fetchone() is not None
+    email_filter.observe(found)
+    return found
+
+
 # 2. 로그인
-def login_controller(email, password, response, db):
+async def login_controller(email, password, response, db):
     sql = text("SELECT * FROM users WHERE email = :email AND deleted_at IS NULL")
-    user = db.execute(sql, {"email": email}).fetchone()
+    user = (await db.execute(sql, {"email": email})).fetchone()
 
     if not user:
         raise HTTPException(status_code=401, detail="이메일 또는 비밀번호 불일치")
 
-    if not bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
+    if not await password_hasher.verify(password, user.password):
         raise HTTPException(status_code=401, detail="이메일 또는 비밀번호 불일치")
 
     session_id = str(uuid.uuid4())
-    db.execute(
-        text("INSERT INTO sessions (session_id, expires, data) VALUES (:sess_id, 0, :u_id)"),
-        {"sess_id": session_id, "u_id": str(user.id)}
+    await db.execute(
+        text("INSERT INTO sessions (session_id, expires, data, user_id) VALUES (:sess_id, :expires, :u_id, :uid)"),
+        {"sess_id": session_id, "expires": sessions.new_expiry(), "u_id": str(user.id), "uid": user.id}
     )
-    db.commit()
+    await _drop_extra_sessions(user.id, db)
+    await db.commit()
 
     response.set_cookie(key="session_id", value=session_id, httponly=True, samesite="Lax", secure=False)
     return {"message": "로그인 성공"}
 
 
+async def _drop_extra_sessions(user_id, db):
+    # 사용자당 세션은 MAX_SESSIONS_PER_USER 개까지만 남기고, 만료가 가장 가까운(오래된) 것부터 지운다.
+    stale = (await db.execute(
+        text("SELECT session_id FROM sessions WHERE user_id = :uid ORDER BY expires DESC LIMIT 1000 OFFSET :keep"),
+        {"uid": user_id, "keep": sessions.MAX_SESSIONS_PER_USER})).fetchall()
+    if not stale:
+        return
+    stale_ids = [r.session_id for r in stale]
+    await db.execute(text("DELETE FROM sessions WHERE session_id IN :ids").bindparams(
+        bindparam("ids", expanding=True)), {"ids": stale_ids})
+    for stale_id in stale_ids:
+        session_cache.pop(stale_id)
+
+
 # 3. 로그아웃
-def logout_controller(request, response, db):
+async def logout_controller(request, response, db):
     session_id = request.cookies.get("session_id")
     if session_id:
-        db.execute(text("DELETE FROM sessions WHERE session_id = :sess_id"), {"sess_id": session_id})
-        db.commit()
+        session_cache.pop(session_id)
+        await db.execute(text("DELETE FROM sessions WHERE session_id = :sess_id"), {"sess_id": session_id})
+        await db.commit()
     response.delete_cookie("session_id")
     return {"message": "로그아웃"}
 
 
 # 4. 내 정보 조회
-def get_me_controller(request, db):
-    user_id = get_current_user_id(request, db)
-    user = db.execute(text("SELECT id, email, nickname, image_url FROM users WHERE id = :uid"),
-                      {"uid": user_id}).fetchone()
+async def get_me_controller(request, db):
+    user_id = await get_current_user_id(request, db)
+    user = (await db.execute(text("SELECT id, email, nickname, image_url FROM users WHERE id = :uid"),
+                             {"uid": user_id})).fetchone()
     return {"id": user.id, "email": user.email, "nickname": user.nickname, "profile_image": user.image_url}
 
 
 # 5. 게시글 목록 (삭제된 글 제외)
-def get_posts_list_controller(offset, limit, db):
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded).decode())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다.")
+
+
+async def get_posts_list_controller(offset, limit, request, db, cursor=None):
+    limit = max(1, min(limit, POSTS_MAX_LIMIT))
+    offset = max(0, offset)
+    cacheable = not cursor and offset % limit == 0 and offset < POSTS_CACHE_PAGES * limit
+    # 쓰기 직후 primary 로 고정된 클라이언트는 캐시를 읽지도 채우지도 않는다 (replica 에서 채워진 옛 페이지를 보지 않도록).
+    if not cacheable or sticky_to_primary(request):
+        posts = await _fetch_posts_page(offset, limit, db, cursor)
+        return json_response(request, lambda: dumps(_posts_page(posts, limit)), _posts_page_etag(posts, limit))
+    # replica 에서 읽은 페이지는 출처별로 따로 두어 primary 에서 읽는 요청에 섞이지 않게 한다.
+    source = "replica" if getattr(request.state, "db_replica", False) else "primary"
+    cache_key = (source, offset, limit)
+    cached = posts_page_cache.get(cache_key)
+    if cached is None:
+        generation = posts_page_cache.generation
+        cached = await _build_posts_page(offset, limit, db, cursor)
+        posts_page_cache.set(cache_key, cached, generation)
+    body, etag, encoded = cached
+    return json_response(request, body, etag, encoded=encoded)
+
+
+async def _build_posts_page(offset, limit, db, cursor):
+    # (본문, ETag, 인코딩별 압축 본문). 압축 결과도 캐시 항목과 같이 재사용한다.
+    posts = await _fetch_posts_page(offset, limit, db, cursor)
+    return dumps(_posts_page(posts, limit)), _posts_page_etag(posts, limit), {}
+
+
+def _posts_page_etag(posts, limit):
+    # next_cursor 는 행과 limit 으로 정해진다.
+    return weak_etag([tuple(p) for p in posts], limit)
+
+
+# 컬럼 별칭이 곧 응답 키다 (행 -> dict 변환 한 번으로 응답 항목이 된다).
+POSTS_LIST_SQL = """
+               SELECT p.id             as post_id,
+                      p.title,
+                      p.likes_count    as likes,
+                      p.comments_count as comments,
+                      p.views_count    as views,
+                      p.created_at,
+                      p.image_url      as image_thumbnail,
+                      u.nickname       as author_nickname,
+                      u.image_url      as author_profile_image
+               FROM posts p
+                        JOIN users u ON p.user_id = u.id
+               """
+
+
+async def _fetch_posts_page(offset, limit, db, cursor):
+    # cursor 가 있으면 마지막으로 본 post_id 이후부터 seek (OFFSET 스캔 없음)
+    if cursor:
+        sql = text(POSTS_LIST_SQL + " WHERE p.deleted_at IS NULL AND p.id < :cursor ORDER BY p.id DESC LIMIT :limit")
+        params = {"limit": limit, "cursor": decode_cursor(cursor)}
+    else:
+        sql = text(POSTS_LIST_SQL + " WHERE p.deleted_at IS NULL ORDER BY p.id DESC LIMIT :limit OFFSET :offset")
+        params = {"limit": limit, "offset": offset}
+    return (await db.execute(sql, params)).fetchall()
+
+
+def _posts_page(posts, limit):
+    next_cursor = encode_cursor(posts[-1].post_id) if posts and len(posts) == limit else None
+    return {"posts": [_post_item(p) for p in posts], "next_cursor": next_cursor}
+
+
+def _post_item(p):
+    item = p._asdict()
+    item["image_thumbnail"] = thumbnail_url(p.image_thumbnail)
+    item["author_profile_image"] = thumbnail_url(p.author_profile_image)
+    return item
+
+
+# 5-1. 인기 게시글 (메모리 순위에서 바로 응답, DB 조회 없음)
+POPULAR_MAX_LIMIT = 50
+
+# 목록과 같은 컬럼 + 작성자 id (닉네임 변경을 순위의 요약에 반영하려고 따로 들고 있는다)
+POPULAR_SUMMARY_SQL = POSTS_LIST_SQL.replace("SELECT", "SELECT p.user_id        as author_id,\n                     ", 1) \
+                      + " WHERE p.id IN :ids AND p.deleted_at IS NULL"
+
+# 순위를 다시 만들 때 읽는 최근 이벤트 (각 테이블의 created_at 인덱스를 탄다)
+POPULAR_EVENTS_SQL = """
+                     SELECT post_id, created_at, 'like' as kind FROM likes WHERE created_at >= :since
+                     UNION ALL
+                     SELECT post_id, created_at, 'comment' FROM comments
+                     WHERE created_at >= :since AND deleted_at IS NULL
+                     UNION ALL
+                     SELECT post_id, created_at, 'view' FROM views WHERE created_at >= :since
+                     """
+POPULAR_LOOKBACK_DAYS = float(os.getenv("POPULAR_LOOKBACK_DAYS", "7"))
+
+
+async def get_popular_posts_controller(limit):
+    limit = max(1, min(limit, POPULAR_MAX_LIMIT))
+    return FastJSONResponse({"posts": popular_posts.top(limit)})
+
+
+async def _load_popular_summaries(ids, db):
+    sql = text(POPULAR_SUMMARY_SQL).bindparams(bindparam("ids", expanding=True))
+    summaries = {}
+    for start in range(0, len(ids), 500):
+        for p in (await db.execute(sql, {"ids": ids[start:start + 500]})).fetchall():
+            item = _post_item(p)
+            summaries[p.post_id] = (item, item.pop("author_id"))
+    return summaries
+
+
+async def _track_popular(post_id, kind, db, sign=1):
+    # 카운터 갱신(update_summary / add_count)은 이 함수보다 먼저 한다. 새로 들어온 게시글은 여기서 최신 값으로 읽는다.
+    popular_posts.record(post_id, kind, sign)
+    if popular_posts.needs_summary(post_id):
+        for pid, (item, author_id) in (await _load_popular_summaries([post_id], db)).items():
+            popular_posts.set_summary(pid, item, author_id)
+
+
+def _popular_summary_from_detail(post, views_count):
+    # 상세 조회 행으로 목록 항목(POSTS_LIST_SQL 과 같은 키)을 만든다. 작성자가 없는 글은 목록 쿼리(JOIN)처럼 빼므로
+    # 요약 없이 두고, 다음 주기 재계산에서 DB 기준으로 정리된다.
+    if post.author_nickname is None:
+        return None
+    item = {
+        "post_id": post.id,
+        "title": post.title,
+        "likes": post.likes_count,
+        "comments": post.comments_count,
+        "views": views_count,
+        "created_at": post.created_at,
+        "image_thumbnail": thumbnail_url(post.image_url),
+        "author_nickname": post.author_nickname,
+        "author_profile_image": thumbnail_url(post.author_profile_image),
+    }
+    return item, post.user_id
+
+
+def _timestamp(value):
+    # SQLite 는 TIMESTAMP 를 문자열로 돌려준다.
+    return (datetime.fromisoformat(value) if isinstance(value, str) else value).timestamp()
+
+
+async def rebuild_popular_posts():
+    """최근 POPULAR_LOOKBACK_DAYS 동안의 좋아요/댓글/조회 기록을 한 번 훑어서 순위를 새로 만든다."""
+    epoch = time.time()
+    since = datetime.fromtimestamp(epoch - POPULAR_LOOKBACK_DAYS * 86400).strftime("%Y-%m-%d %H:%M:%S")
+    scores = {}
+    async with connect() as db:
+        result = await db.stream(text(POPULAR_EVENTS_SQL), {"since": since})
+        async for e in result:
+            scores[e.post_id] = scores.get(e.post_id, 0.0) + popular_posts.weight(e.kind, _timestamp(e.created_at),
+                                                                                  epoch)
+        top = dict(heapq.nlargest(popular_posts.max_tracked, scores.items(), key=lambda item: item[1]))
+        summaries = await _load_popular_summaries(list(top), db)
+    popular_posts.replace(epoch, top, summaries)
+    return len(top)
+
+
+# 5-2. 게시글 검색 (메모리 n-gram 색인에서 id 를 찾고, 해당 페이지의 글만 PK 로 조회)
+SEARCH_MAX_LIMIT = 50
+
+
+def _decode_search_cursor(cursor):
+    # 검색 커서는 이전 페이지 마지막 항목의 "점수:id"
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, post_id = base64.urlsafe_b64decode(padded).decode().split(":")
+        return int(score), int(post_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다.")
+
+
+async def search_posts_controller(q, limit, db, cursor=None):
+    if not grams(q):
+        raise HTTPException(status_code=400, detail="검색어는 두 글자 이상 입력해주세요.")
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    page, has_more = await post_search.search(q, limit, _decode_search_cursor(cursor) if cursor else None)
+    next_cursor = encode_cursor(f"{page[-1][0]}:{page[-1][1]}") if has_more else None
+    if not page:
+        return FastJSONResponse({"posts": [], "next_cursor": next_cursor})
+
+    # 다른 워커에서 방금 삭제된 글은 색인에 남아 있을 수 있으므로 deleted_at 으로 한 번 더 거른다.
+    sql = text(POSTS_LIST_SQL + " WHERE p.id IN :ids AND p.deleted_at IS NULL").bindparams(
+        bindparam("ids", expanding=True))
+    rows = {p.post_id: p for p in (await db.execute(sql, {"ids": [post_id for _, post_id in page]})).fetchall()}
+    posts = [_post_item(rows[post_id]) for _, post_id in page if post_id in rows]
+    return FastJSONResponse({"posts": posts, "next_cursor": next_cursor})
+
+
+# 6. 게시글 상세 (게시글 + 작성자 + 내 좋아요 여부를 한 번의 쿼리로 조회)
+async def get_post_detail_controller(post_id, request, db):
+    current_user_id = -1
+    try:
+        current_user_id = await get_current_user_id(request, db)
+    except HTTPException:
+        pass
+
     sql = text("""
                SELECT p.id,
+                      p.user_id,
                       p.title,
+                      p.contents,
+                      p.image_url,
                       p.likes_count,
                       p.views_count,
                       p.comments_count,
                       p.created_at,
                       u.nickname  as author_nickname,
-                      u.image_url as author_profile_image
+                      u.image_url as author_profile_image,
+                      l.id        as like_id
                FROM posts p
-                        JOIN users u ON p.user_id = u.id
-               WHERE p.deleted_at IS NULL
-               ORDER BY p.id DESC LIMIT :limit
-               OFFSET :offset
+                        LEFT JOIN users u ON u.id = p.user_id
+                        LEFT JOIN likes l ON l.post_id = p.id AND l.user_id = :uid
+               WHERE p.id = :pid
+                 AND p.deleted_at IS NULL
                """)
-    posts = db.execute(sql, {"limit": limit, "offset": offset}).fetchall()
-
-    results = []
-    for p in posts:
-        results.append({
-            "post_id": p.id,
-            "title": p.title,
-            "likes": p.likes_count,
-            "comments": p.comments_count,
-            "views": p.views_count,
-            "created_at": str(p.created_at),
-            "author_nickname": p.author_nickname,
-            "author_profile_image": p.author_profile_image
-        })
-    return {"posts": results}
-
-
-# 6. 게시글 상세
-def get_post_detail_controller(post_id, request, db):
-    sql = text("""
-               SELECT id,
-                      user_id,
-                      title,
-                      contents,
-                      image_url,
-                      likes_count,
-                      views_count,
-                      comments_count as comments_count,
-                      created_at,
-                      deleted_at
-               FROM posts
-               WHERE id = :pid
-                 AND deleted_at IS NULL
-               """)
-    post = db.execute(sql, {"pid": post_id}).fetchone()
+    post = (await db.execute(sql, {"pid": post_id, "uid": current_user_id})).fetchone()
 
     if not post:
         raise HTTPException(status_code=404, detail="삭제되었거나 존재하지 않는 게시글입니다.")
 
-    current_user_id = -1
-    try:
-        current_user_id = get_current_user_id(request, db)
-        if not db.execute(text("SELECT id FROM views WHERE user_id=:uid AND post_id=:pid"),
-                          {"uid": current_user_id, "pid": post_id}).fetchone():
-            db.execute(text("INSERT INTO views (user_id, post_id) VALUES (:uid, :pid)"),
-                       {"uid": current_user_id, "pid": post_id})
-            db.execute(text("UPDATE posts SET views_count = views_count + 1 WHERE id = :pid"), {"pid": post_id})
-            db.commit()
-            post = db.execute(sql, {"pid": post_id}).fetchone()
-    except:
-        pass
-
-    writer = db.execute(text("SELECT nickname, image_url FROM users WHERE id = :uid"), {"uid": post.user_id}).fetchone()
-    is_liked = False
-    if current_user_id != -1 and db.execute(text("SELECT id FROM likes WHERE user_id=:uid AND post_id=:pid"),
-                                            {"uid": current_user_id, "pid": post_id}).fetchone():
-        is_liked = True
-
-    return {
+    # 조회수는 메모리 버퍼에 기록하고 주기적으로 DB 에 반영 (요청 경로는 읽기 전용)
+    views_count = post.views_count + view_buffer.pending_views(post_id)
+    if current_user_id != -1 and view_buffer.record(current_user_id, post_id):
+        views_count += 1
+        post_events.publish(post_id, "counts", {"views_count": views_count})
+        popular_posts.add_count(post_id, "views", 1)
+        # 순위에 처음 들어오는 글은 이미 읽은 행으로 요약을 만든다 (상세 조회는 쿼리 1개 예산, 추가 조회 없음).
+        popular_posts.record(post_id, "view")
+        if popular_posts.needs_summary(post_id):
+            summary = _popular_summary_from_detail(post, views_count)
+            if summary is not None:
+                popular_posts.set_summary(post_id, *summary)
+
+    # 행 값 + 버퍼의 조회수 + 보는 사람(is_owner/is_liked) 이 같으면 본문도 같다. 304 면 dict 를 만들지도 직렬화하지도 않는다.
+    etag = weak_etag(tuple(post), views_count, current_user_id)
+    return json_response(request, lambda: dumps({
         "post_id": post.id,
         "title": post.title,
         "content": post.contents,
         "image": post.image_url,
         "likes_count": post.likes_count,
-        "views_count": post.views_count,
+        "views_count": views_count,
         "comments_count": post.comments_count,
-        "created_at": str(post.created_at),
-        "author_nickname": writer.nickname if writer else "Unknown",
-        "author_profile_image": writer.image_url if writer else "",
+        "created_at": post.created_at,
+        "author_nickname": post.author_nickname if post.author_nickname is not None else "Unknown",
+        "author_profile_image": post.author_profile_image if post.author_nickname is not None else "",
         "is_owner": (current_user_id == post.user_id),
-        "is_liked": is_liked
-    }
+        "is_liked": post.like_id is not None
+    }), etag, private=True)
 
 
 # 7. 게시글 작성
-def create_post_controller(title, content, image, request, db):
-    user_id = get_current_user_id(request, db)
-    image_url = save_image(image)
+async def create_post_controller(title, content, image, request, db):
+    user_id = await get_current_user_id(request, db)
+    image_url = await save_image(image)
     sql = text(
         "INSERT INTO posts (user_id, title, contents, image_url, created_at) VALUES (:uid, :title, :content, :img, NOW())")
-    db.execute(sql, {"uid": user_id, "title": title, "content": content, "img": image_url})
-    db.commit()
+    inserted = await db.execute(sql, {"uid": user_id, "title": title, "content": content, "img": image_url})
+    await db.commit()
+    post_search.add(inserted.lastrowid, title, content)
+    invalidate_posts_cache()
     return {"message": "게시글 등록 성공"}
 
 
 # 8. 게시글 수정
-def update_post_controller(post_id, title, content, image, request, db):
-    user_id = get_current_user_id(request, db)
-    post = db.execute(text("SELECT user_id FROM posts WHERE id=:pid AND deleted_at IS NULL"),
-                      {"pid": post_id}).fetchone()
+async def update_post_controller(post_id, title, content, image, request, db):
+    user_id = await get_current_user_id(request, db)
+    post = (await db.execute(text("SELECT user_id, title, contents FROM posts WHERE id=:pid AND deleted_at IS NULL"),
+                             {"pid": post_id})).fetchone()
     if not post or post.user_id != user_id: raise HTTPException(status_code=403, detail="권한 없음")
 
     if image:
-        new_url = save_image(image)
-        db.execute(text("UPDATE posts SET title=:t, contents=:c, image_url=:i WHERE id=:pid"),
-                   {"t": title, "c": content, "i": new_url, "pid": post_id})
+        new_url = await save_image(image)
+        await db.execute(text("UPDATE posts SET title=:t, contents=:c, image_url=:i WHERE id=:pid"),
+                         {"t": title, "c": content, "i": new_url, "pid": post_id})
+        popular_posts.update_summary(post_id, image_thumbnail=thumbnail_url(new_url))
     else:
-        db.execute(text("UPDATE posts SET title=:t, contents=:c WHERE id=:pid"),
-                   {"t": title, "c": content, "pid": post_id})
-    db.commit()
+        await db.execute(text("UPDATE posts SET title=:t, contents=:c WHERE id=:pid"),
+                         {"t": title, "c": content, "pid": post_id})
+    await db.commit()
+    popular_posts.update_summary(post_id, title=title)
+    # 검색 색인에서는 이전 제목/본문의 n-gram 을 빼고 새 값으로 다시 넣는다.
+    post_search.update(post_id, post.title, post.contents, title, content)
+    invalidate_posts_cache()
     return {"message": "수정 완료"}
 
 
 # 9. 게시글 삭제 (Soft Delete)
-def delete_post_controller(post_id, request, db):
-    user_id = get_current_user_id(request, db)
-    post = db.execute(text("SELECT user_id FROM posts WHERE id=:pid AND deleted_at IS NULL"),
-                      {"pid": post_id}).fetchone()
+async def delete_post_controller(post_id, request, db):
+    user_id = await get_current_user_id(request, db)
+    post = (await db.execute(text("SELECT user_id, title, contents FROM posts WHERE id=:pid AND deleted_at IS NULL"),
+                             {"pid": post_id})).fetchone()
     if not post or post.user_id != user_id: raise HTTPException(status_code=403, detail="권한 없음")
 
-    db.execute(text("UPDATE posts SET deleted_at = NOW() WHERE id=:pid"), {"pid": post_id})
-    db.commit()
+    await db.execute(text("UPDATE posts SET deleted_at = NOW() WHERE id=:pid"), {"pid": post_id})
+    await db.commit()
+    popular_posts.forget(post_id)
+    post_search.remove(post_id, post.title, post.contents)
+    invalidate_posts_cache()
     return {"message": "삭제 완료"}
 
 
-# 10. 좋아요
-def like_post_controller(post_id, request, db):
-    user_id = get_current_user_id(request, db)
-    post = db.execute(text("SELECT * FROM posts WHERE id=:pid AND deleted_at IS NULL"), {"pid": post_id}).fetchone()
-    if not post: raise HTTPException(status_code=404, detail="게시글 없음")
+# 10. 좋아요 (토글)
+def _is_deadlock(exc):
+    # MySQL 1213: Deadlock found when trying to get lock
+    return bool(getattr(exc.orig, "args", None)) and exc.orig.args[0] == 1213
 
-    existing = db.execute(text("SELECT id FROM likes WHERE user_id=:uid AND post_id=:pid"),
-                          {"uid": user_id, "pid": post_id}).fetchone()
-    is_liked = False
-    if existing:
-        db.execute(text("DELETE FROM likes WHERE id=:lid"), {"lid": existing.id})
-        if post.likes_count > 0: db.execute(text("UPDATE posts SET likes_count = likes_count - 1 WHERE id=:pid"),
-                                           {"pid": post_id})
-    else:
-        db.execute(text("INSERT INTO likes (user_id, post_id) VALUES (:uid, :pid)"), {"uid": user_id, "pid": post_id})
-        db.execute(text("UPDATE posts SET likes_count = likes_count + 1 WHERE id=:pid"), {"pid": post_id})
-        is_liked = True
-    db.commit()
-    updated = db.execute(text("SELECT likes_count FROM posts WHERE id=:pid"), {"pid": post_id}).fetchone()
-    return {"likes_count": updated.likes_count, "is_liked": is_liked}
+
+async def like_post_controller(post_id, request, db):
+    user_id = await get_current_user_id(request, db)
+    params = {"uid": user_id, "pid": post_id}
+
+    for attempt in range(LIKE_TOGGLE_RETRIES):
+        try:
+            result = await _toggle_like(params, db)
+            post_events.publish(post_id, "counts", {"likes_count": result["likes_count"]})
+            popular_posts.update_summary(post_id, likes=result["likes_count"])
+            await _track_popular(post_id, "like", db, sign=1 if result["is_liked"] else -1)
+            return result
+        except OperationalError as e:
+            await db.rollback()
+            if not _is_deadlock(e) or attempt == LIKE_TOGGLE_RETRIES - 1:
+                raise
+
+
+async def _toggle_like(params, db):
+    # INSERT 를 먼저 시도하고 (user_id, post_id) UNIQUE 제약에 걸리면 이미 누른 좋아요이므로 DELETE 한다.
+    # 잠금 순서는 항상 likes → posts 이고, 카운터와 결과 값은 같은 트랜잭션 안에서 처리한다.
+    try:
+        await db.execute(text("INSERT INTO likes (user_id, post_id) VALUES (:uid, :pid)"), params)
+        is_liked, delta = True, 1
+    except IntegrityError:
+        deleted = await db.execute(text("DELETE FROM likes WHERE user_id=:uid AND post_id=:pid"), params)
+        is_liked, delta = False, -deleted.rowcount
+
+    updated = await db.execute(text("UPDATE posts SET likes_count = likes_count + :delta "
+                                    "WHERE id=:pid AND deleted_at IS NULL"), {**params, "delta": delta})
+    if not updated.rowcount:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="게시글 없음")
+
+    likes_count = (await db.execute(text("SELECT likes_count FROM posts WHERE id=:pid"), params)).scalar()
+    await db.commit()
+    return {"likes_count": likes_count, "is_liked": is_liked}
 
 
 # 11. 댓글 작성
-def create_comment_controller(post_id, content, request, db):
-    user_id = get_current_user_id(request, db)
+async def create_comment_controller(post_id, content, request, db):
+    user_id = await get_current_user_id(request, db)
 
     if not content:
         raise HTTPException(status_code=400, detail="내용을 입력해주세요.")
     if len(content) > 1000:
         raise HTTPException(status_code=400, detail="댓글은 1000자까지만 가능합니다.")
 
-    if not db.execute(text("SELECT id FROM posts WHERE id=:pid AND deleted_at IS NULL"), {"pid": post_id}).fetchone():
+    if not (await db.execute(text("SELECT id FROM posts WHERE id=:pid AND deleted_at IS NULL"),
+                             {"pid": post_id})).fetchone():
         raise HTTPException(status_code=404, detail="게시글이 없습니다.")
 
-    db.execute(
+    inserted = await db.execute(
         text("INSERT INTO comments (post_id, user_id, content, created_at) VALUES (:pid, :uid, :content, NOW())"),
         {"pid": post_id, "uid": user_id, "content": content})
-    db.execute(text("UPDATE posts SET comments_count = comments_count + 1 WHERE id = :pid"), {"pid": post_id})
-    db.commit()
+    await db.execute(text("UPDATE posts SET comments_count = comments_count + 1 WHERE id = :pid"), {"pid": post_id})
+    await db.commit()
+    popular_posts.add_count(post_id, "comments", 1)
+    await _track_popular(post_id, "comment", db)
+    await _publish_comment_change(post_id, inserted.lastrowid, "created", db)
     return {"message": "댓글 등록"}
 
 
-# 12. 댓글 목록
-def get_comments_controller(post_id, request, db):
-    sql = text("""
-               SELECT c.*, u.nickname, u.image_url
+async def _publish_comment_change(post_id, comment_id, action, db, count_changed=True):
+    # 구독자가 없으면 카운터를 다시 읽지 않는다.
+    if not post_events.has_subscribers(post_id):
+        return
+    if count_changed:
+        comments_count = (await db.execute(text("SELECT comments_count FROM posts WHERE id = :pid"),
+                                           {"pid": post_id})).scalar()
+        post_events.publish(post_id, "counts", {"comments_count": comments_count})
+    post_events.publish(post_id, "comments", {"action": action, "comment_id": comment_id})
+
+
+# 12. 댓글 목록 (댓글 id 기준 cursor 페이지네이션, 오래된 순)
+COMMENTS_SQL = """
+               SELECT c.id       as comment_id,
+                      c.content,
+                      c.created_at,
+                      u.nickname as author_nickname,
+                      u.image_url as author_profile_image,
+                      c.user_id
                FROM comments c
                         JOIN users u ON c.user_id = u.id
                WHERE c.post_id = :pid
                  AND c.deleted_at IS NULL
-               """)
-    comments = db.execute(sql, {"pid": post_id}).fetchall()
+                 AND c.id > :cursor
+               ORDER BY c.id
+               """
 
-    current_user_id = -1
+
+def _comment_item(c, current_user_id):
+    item = c._asdict()
+    item["author_profile_image"] = thumbnail_url(c.author_profile_image)
+    item["is_owner"] = item.pop("user_id") == current_user_id
+    return item
+
+
+async def _optional_user_id(request, db):
     try:
-        current_user_id = get_current_user_id(request, db)
-    except:
-        pass
+        return await get_current_user_id(request, db)
+    except HTTPException:
+        return -1
 
-    results = []
-    for c in comments:
-        results.append({
-            "comment_id": c.id,
-            "content": c.content,
-            "created_at": str(c.created_at),
-            "author_nickname": c.nickname,
-            "author_profile_image": c.image_url,
-            "is_owner": (c.user_id == current_user_id)
-        })
-    return results
+
+async def get_comments_controller(post_id, request, db, cursor=None, limit=COMMENTS_PAGE_SIZE):
+    limit = max(1, min(limit, MAX_COMMENTS_PAGE_SIZE))
+    sql = text(COMMENTS_SQL + " LIMIT :limit")
+    params = {"pid": post_id, "cursor": decode_cursor(cursor) if cursor else 0, "limit": limit}
+    comments = (await db.execute(sql, params)).fetchall()
+
+    current_user_id = await _optional_user_id(request, db)
+
+    # 응답 본문은 기존 클라이언트와 호환되도록 배열 그대로 두고, 다음 페이지 커서는 헤더로 내려준다.
+    headers = {}
+    if len(comments) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(comments[-1].comment_id)
+    etag = weak_etag([tuple(c) for c in comments], current_user_id, limit)
+    return json_response(request, lambda: dumps([_comment_item(c, current_user_id) for c in comments]), etag,
+                         headers=headers, private=True)
+
+
+async def stream_comments_controller(post_id, request, cursor=None):
+    params = {"pid": post_id, "cursor": decode_cursor(cursor) if cursor else 0}
+
+    async def rows():
+        # 스트림이 쓰는 커넥션은 이것 하나다 (세션 확인도 여기서 한다). 전송이 끝나면 바로 반납된다.
+        async with connect() as conn:
+            current_user_id = await _optional_user_id(request, conn)
+            result = await conn.stream(text(COMMENTS_SQL), params)
+            async for c in result:
+                yield dumps(_comment_item(c, current_user_id)) + b"\n"
+
+    return ClosingStreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+# 12-1. 게시글 실시간 카운터 (SSE). 좋아요/댓글/조회 변경을 모아서 보내고, 주기적으로 keepalive 를 보낸다.
+async def post_events_controller(post_id):
+    reservation = post_events.reserve()
+    try:
+        # 스냅샷만 읽고 커넥션을 바로 반납한다. 스트림은 DB 를 쓰지 않으므로 오래 열려 있어도 풀을 잡지 않는다.
+        async with connect() as db:
+            post = (await db.execute(text("SELECT likes_count, comments_count, views_count FROM posts "
+                                          "WHERE id = :pid AND deleted_at IS NULL"), {"pid": post_id})).fetchone()
+        if not post:
+            raise HTTPException(status_code=404, detail="게시글이 없습니다.")
+    except BaseException:
+        reservation.release()
+        raise
+
+    snapshot = {
+        "likes_count": post.likes_count,
+        "comments_count": post.comments_count,
+        "views_count": post.views_count + view_buffer.pending_views(post_id),
+    }
+    return post_events.response(post_id, snapshot, reservation)
 
 
 # 13. 댓글 삭제 (Soft Delete)
-def delete_comment_controller(comment_id, request, db):
-    user_id = get_current_user_id(request, db)
-    check = db.execute(text("SELECT user_id FROM comments WHERE id=:cid AND deleted_at IS NULL"),
-                       {"cid": comment_id}).fetchone()
+async def delete_comment_controller(comment_id, request, db):
+    user_id = await get_current_user_id(request, db)
+    check = (await db.execute(text("SELECT user_id, post_id FROM comments WHERE id=:cid AND deleted_at IS NULL"),
+                              {"cid": comment_id})).fetchone()
     if not check or check.user_id != user_id: raise HTTPException(status_code=403, detail="권한 없음")
 
-    db.execute(text("UPDATE comments SET deleted_at = NOW() WHERE id=:cid"), {"cid": comment_id})
-    db.commit()
+    # 동시에 두 번 삭제돼도 카운터는 한 번만 줄도록, 실제로 삭제 표시를 한 경우에만 감소시킨다.
+    deleted = await db.execute(text("UPDATE comments SET deleted_at = NOW() WHERE id=:cid AND deleted_at IS NULL"),
+                               {"cid": comment_id})
+    if deleted.rowcount:
+        await db.execute(text("UPDATE posts SET comments_count = comments_count - 1 WHERE id = :pid"),
+                         {"pid": check.post_id})
+    await db.commit()
+    if deleted.rowcount:
+        popular_posts.add_count(check.post_id, "comments", -1)
+        await _publish_comment_change(check.post_id, comment_id, "deleted", db)
     return {"message": "삭제 완료"}
 
 
 # 14. 댓글 수정
-def update_comment_controller(comment_id, content, request, db):
-    user_id = get_current_user_id(request, db)
-    check = db.execute(text("SELECT user_id FROM comments WHERE id=:cid AND deleted_at IS NULL"),
-                       {"cid": comment_id}).fetchone()
+async def update_comment_controller(comment_id, content, request, db):
+    user_id = await get_current_user_id(request, db)
+    check = (await db.execute(text("SELECT user_id, post_id FROM comments WHERE id=:cid AND deleted_at IS NULL"),
+                              {"cid": comment_id})).fetchone()
     if not check or check.user_id != user_id: raise HTTPException(status_code=403, detail="권한 없음")
 
-    db.execute(text("UPDATE comments SET content=:c WHERE id=:cid"), {"c": content, "cid": comment_id})
-    db.commit()
+    await db.execute(text("UPDATE comments SET content=:c WHERE id=:cid"), {"c": content, "cid": comment_id})
+    await db.commit()
+    await _publish_comment_change(check.post_id, comment_id, "updated", db, count_changed=False)
     return {"message": "수정 완료"}
 
 
 # 15. 이메일 중복 체크
-def check_email_controller(email, db):
-    if db.execute(text("SELECT id FROM users WHERE email=:e"), {"e": email}).fetchone():
+async def check_email_controller(email, db):
+    if await _email_exists(email, db):
         raise HTTPException(status_code=409, detail="중복")
     return {"message": "가능"}
 
 
 # 16. 닉네임 수정
-def update_nickname_controller(user_id, nickname, request, db):
-    current_user_id = get_current_user_id(request, db)
+async def update_nickname_controller(user_id, nickname, request, db):
+    current_user_id = await get_current_user_id(request, db)
     if current_user_id != user_id: raise HTTPException(status_code=403, detail="권한 없음")
-    db.execute(text("UPDATE users SET nickname=:n WHERE id=:uid"), {"n": nickname, "uid": user_id})
-    db.commit()
+    await db.execute(text("UPDATE users SET nickname=:n WHERE id=:uid"), {"n": nickname, "uid": user_id})
+    await db.commit()
+    popular_posts.rename_author(user_id, nickname)
+    invalidate_posts_cache()
     return {"message": "수정 완료"}
 
 
 # 17. 비밀번호 수정
-def update_password_controller(password, request, db):
-    user_id = get_current_user_id(request, db)
-    password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
-    db.execute(text("UPDATE users SET password=:p WHERE id=:uid"), {"p": hashed_password, "uid": user_id})
-    db.commit()
+async def update_password_controller(password, request, db):
+    user_id = await get_current_user_id(request, db)
+    hashed_password = await password_hasher.hash(password)
+    await db.execute(text("UPDATE users SET password=:p WHERE id=:uid"), {"p": hashed_password, "uid": user_id})
+    await db.commit()
     return {"message": "수정 완료"}
 
 
 # 18. 회원 탈퇴 (Soft Delete)
-def delete_user_controller(request, response, db):
-    user_id = get_current_user_id(request, db)
-    db.execute(text("UPDATE users SET deleted_at = NOW() WHERE id=:uid"), {"uid": user_id})
-    db.commit()
+async def delete_user_controller(request, response, db):
+    user_id = await get_current_user_id(request, db)
+    await db.execute(text("UPDATE users SET deleted_at = NOW() WHERE id=:uid"), {"uid": user_id})
+    await db.execute(text("DELETE FROM sessions WHERE user_id = :uid"), {"uid": user_id})
+    await db.commit()
+    session_cache.evict_if(lambda _, cached: cached[0] == user_id)
     response.delete_cookie("session_id")
     return {"message": "탈퇴 완료"}
\ No newline at end of file
@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import unicodedata
+
+from sqlalchemy import text
+
+from app.db import connect
+
+logger = logging.getLogger(__name__)
+
+# 갱신할 때 마지막으로 본 id 보다 이만큼 앞에서부터 다시 읽는다 (늦게 커밋된 작은 id 의 가입을 놓치지 않도록).
+REFRESH_OVERLAP_IDS = 1000
+
+
+def normalize(email):
+    # DB 비교보다 느슨하게 맞춰야 "없음" 판정이 틀리지 않는다. MySQL 기본 collation(utf8mb4_0900_ai_ci)은 대소문자와
+    # 악센트를 무시하고 호환 문자(전각 등)를 같은 글자로 보므로, NFKD 로 풀어서 결합 문자(악센트)를 버리고 casefold 한다.
+    decomposed = unicodedata.normalize("NFKD", email.strip())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+class BloomFilter:
+    """비트 배열 + 해시 k 개. "없음" 은 확실하고, "있음" 은 error_rate 확률로 틀릴 수 있다."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # 128비트 해시 하나를 둘로 나눠 h1 + i*h2 로 k 개 위치를 만든다 (Kirsch-Mitzenmacher).
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        added = False
+        for position in self._positions(key):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                added = True
+        # 이미 있던 키(로 보이는 키)는 세지 않는다 - 다시 읽어서 더해도 count 가 부풀지 않게.
+        if added:
+            self.count += 1
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def memory_bytes(self):
+        return len(self._bits)
+
+    def expected_error_rate(self):
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class EmailFilter:
+    """가입된 이메일의 Bloom filter. 워커 프로세스마다 하나씩 존재한다.
+
+    시작할 때 users 를 id 순으로 한 번 훑어서 채우고, 이후 refresh_interval 마다 마지막으로 본 id 이후만 더한다
+    (다른 워커에서 가입한 이메일 반영). 같은 워커의 가입은 add() 로 바로 반영한다.
+    로드 전에는 모든 이메일을 "있을 수 있음" 으로 답해서 항상 DB 를 확인하게 한다.
+    """
+
+    def __init__(self, min_capacity, error_rate, refresh_interval):
+        self.min_capacity = min_capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.bloom = None
+        self.last_id = 0
+        self.negatives = 0
+        self.db_checks = 0
+        self.false_positives = 0
+        self._task = None
+
+    def might_exist(self, email):
+        # collation 은 NFKD 로 풀리지 않는 글자끼리도 같게 보기도 하므로(ø 와 o 등) ASCII 가 아닌 이메일은 항상 DB 를 확인한다.
+        if self.bloom is None or not email.isascii() or normalize(email) in self.bloom:
+            self.db_checks += 1
+            return True
+        self.negatives += 1
+        return False
+
+    def observe(self, found):
+        """might_exist() 가 True 였을 때 DB 결과를 알려준다 (실측 오탐률 계산용)."""
+        if not found and self.bloom is not None:
+            self.false_positives += 1
+
+    def add(self, email):
+        if self.bloom is not None:
+            self.bloom.add(normalize(email))
+
+    async def load(self):
+        async with connect() as db:
+            # COUNT(*) 는 인덱스 전체를 읽으므로 MAX(id) 로 사용자 수의 상한만 본다.
+            users = (await db.execute(text("SELECT MAX(id) FROM users"))).scalar() or 0
+        # 가입이 늘어도 오탐률이 목표를 넘지 않도록 현재 사용자 수의 2배로 잡는다.
+        bloom = BloomFilter(max(self.min_capacity, users * 2), self.error_rate)
+        self.last_id = await self._fill(bloom, 0)
+        self.bloom = bloom
+        logger.info("이메일 필터 로드: %d개, %d bytes", bloom.count, bloom.memory_bytes)
+
+    async def refresh(self):
+        # 용량을 넘기면 오탐률이 올라가므로 더 큰 필터로 다시 만든다.
+        if self.bloom is None or self.bloom.count > self.bloom.capacity:
+            return await self.load()
+        self.last_id = await self._fill(self.bloom, max(0, self.last_id - REFRESH_OVERLAP_IDS))
+
+    async def _fill(self, bloom, after_id):
+        last_id = after_id
+        # 스트리밍으로 읽으므로 사용자 수와 상관없이 메모리는 필터 크기만큼만 쓴다.
+        async with connect() as db:
+            result = await db.stream(text("SELECT id, email FROM users WHERE id > :after ORDER BY id"),
+                                     {"after": after_id})
+            async for row in result:
+                bloom.add(normalize(row.email))
+                last_id = row.id
+        return last_id
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("이메일 필터 갱신 실패")
+
+    def start(self):
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        bloom = self.bloom
+        checked_absent = self.negatives + self.false_positives
+        return {
+            "loaded": int(bloom is not None),
+            "emails": bloom.count if bloom else 0,
+            "capacity": bloom.capacity if bloom else 0,
+            "hashes": bloom.hashes if bloom else 0,
+            "memory_bytes": bloom.memory_bytes if bloom else 0,
+            "expected_fp_rate": round(bloom.expected_error_rate(), 6) if bloom else 0.0,
+            "observed_fp_rate": round(self.false_positives / checked_absent, 6) if checked_absent else 0.0,
+            "negatives": self.negatives,
+            "db_checks": self.db_checks,
+            "false_positives": self.false_positives,
+        }
+
+
+email_filter = EmailFilter(
+    min_capacity=int(os.getenv("EMAIL_FILTER_CAPACITY", "100000")),
+    error_rate=float(os.getenv("EMAIL_FILTER_ERROR_RATE", "0.01")),
+    refresh_interval=float(os.getenv("EMAIL_FILTER_REFRESH_INTERVAL", "30")),
+)
@@ -0,0 +1,143 @@
+import asyncio
+import os
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.services.serialization import dumps
+
+
+class Subscriber:
+    """SSE 연결 하나. 아직 보내지 못한 이벤트는 종류별로 최신 값 하나만 들고 있는다.
+
+    클라이언트가 느려서 전송이 밀려도 대기열이 쌓이지 않고 값이 덮어써지므로 메모리는 이벤트 종류 수만큼만 쓴다.
+    """
+
+    def __init__(self, post_id):
+        self.post_id = post_id
+        self.pending = {}
+        self.wakeup = asyncio.Event()
+
+    def push(self, event, data):
+        # counts 처럼 필드가 나뉘어 오는 이벤트는 필드별 최신 값으로 합친다.
+        self.pending.setdefault(event, {}).update(data)
+        self.wakeup.set()
+
+
+class Reservation:
+    """reserve() 로 잡은 연결 자리. release() 는 여러 번 불러도 한 번만 반납한다."""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.hub.connections -= 1
+
+
+class EventStreamResponse(StreamingResponse):
+    """스트림이 끝나거나, 본문 생성기가 한 번도 실행되지 않고 끝나도 자리를 반납하는 SSE 응답."""
+
+    def __init__(self, content, reservation):
+        super().__init__(content, media_type="text/event-stream",
+                         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        self.reservation = reservation
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.reservation.release()
+
+
+class EventHub:
+    """게시글별 in-process pub/sub. 워커 프로세스마다 하나씩 있으므로 같은 워커가 처리한 변경만 전달된다."""
+
+    def __init__(self, max_connections, heartbeat, coalesce_window):
+        self.max_connections = max_connections
+        self.heartbeat = heartbeat
+        self.coalesce_window = coalesce_window
+        self.connections = 0
+        self.rejected = 0
+        self.closed = False
+        self._subscribers = {}
+
+    def reserve(self):
+        """연결 한 자리를 바로 잡는다. 확인과 증가 사이에 await 가 없으므로 동시에 들어온 연결이 한도를 넘길 수 없다."""
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="실시간 연결이 너무 많습니다. 잠시 후 다시 시도해주세요.")
+        self.connections += 1
+        return Reservation(self)
+
+    def subscribe(self, post_id):
+        subscriber = Subscriber(post_id)
+        self._subscribers.setdefault(post_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscribers = self._subscribers.get(subscriber.post_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.post_id]
+
+    def has_subscribers(self, post_id):
+        return post_id in self._subscribers
+
+    def publish(self, post_id, event, data):
+        for subscriber in self._subscribers.get(post_id, ()):
+            subscriber.push(event, data)
+
+    def response(self, post_id, snapshot, reservation):
+        return EventStreamResponse(self.stream(post_id, snapshot, reservation), reservation)
+
+    async def stream(self, post_id, snapshot, reservation):
+        # 응답 전송이 시작될 때 등록해야, 시작 전에 끊긴 연결이 구독자로 남지 않는다 (finally 가 항상 실행됨).
+        subscriber = self.subscribe(post_id)
+        try:
+            yield b"retry: 3000\n\n" + _format("counts", snapshot)
+            while not self.closed:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                # 잠깐 기다렸다가 그 사이에 들어온 변경을 한 번에 보낸다 (좋아요 연타 등).
+                await asyncio.sleep(self.coalesce_window)
+                subscriber.wakeup.clear()
+                events, subscriber.pending = subscriber.pending, {}
+                if events:
+                    yield b"".join(_format(event, data) for event, data in events.items())
+        finally:
+            self.unsubscribe(subscriber)
+            reservation.release()
+
+    def close(self):
+        # 종료 시 열린 스트림을 끝내서 서버가 연결이 닫히기를 기다리지 않게 한다.
+        self.closed = True
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.wakeup.set()
+
+    def stats(self):
+        return {
+            "connections": self.connections,
+            "max_connections": self.max_connections,
+            "posts": len(self._subscribers),
+            "rejected": self.rejected,
+        }
+
+
+def _format(event, data):
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+post_events = EventHub(
+    max_connections=int(os.getenv("SSE_MAX_CONNECTIONS", "1000")),
+    heartbeat=float(os.getenv("SSE_HEARTBEAT", "15")),
+    coalesce_window=float(os.getenv("SSE_COALESCE_MS", "250")) / 1000,
+)
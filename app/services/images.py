@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import stat
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIR = "static/images"
+IMAGE_URL_PREFIX = "/static/images/"
+ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif'}
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "320"))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "1"))
+THUMBNAIL_SUFFIX = "_thumb"
+
+# 파일 앞부분(매직 넘버)으로 실제 이미지 형식을 판별한다.
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+]
+
+CONTENT_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".gif": "image/gif"}
+# 내용 해시로 이름 붙인 파일(+썸네일)은 내용이 바뀌지 않으므로 immutable 로 캐시한다.
+HASHED_NAME = re.compile(r"^([0-9a-f]{64})(_thumb)?\.(png|jpg|jpeg|gif)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+_thumbnail_executor = None
+_background_tasks = set()
+_pending_thumbnails = set()
+_legacy_etags = TTLCache(maxsize=10000, ttl=3600)
+
+
+def sniff_image_type(head):
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+
+def image_relpath(digest, ext):
+    # 디렉터리 하나에 파일이 몰리지 않도록 해시 앞 4글자로 2단계 샤딩: ab/cd/abcd....png
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumbnail_path(image_path):
+    root, ext = os.path.splitext(image_path)
+    return f"{root}{THUMBNAIL_SUFFIX}{ext}"
+
+
+def thumbnail_url(image_url):
+    # 목록 응답마다 파일을 확인하지 않도록 URL 만 보고 정한다. 내용 해시 이름의 업로드는 저장할 때 썸네일 생성이
+    # 예약되므로 항상 썸네일 URL 을 주고, 아직 만들어지는 중이면 serve_image 가 원본으로 대신 응답한다.
+    # 해시 이름이 아닌 예전 업로드는 썸네일이 없으므로 원본 URL 을 그대로 쓴다.
+    if not image_url or not image_url.startswith(IMAGE_URL_PREFIX):
+        return image_url
+    match = HASHED_NAME.match(os.path.basename(image_url))
+    if not match or match.group(2):
+        return image_url
+    return thumbnail_path(image_url)
+
+
+def make_thumbnail(src, dst, size):
+    # 프로세스 풀에서 실행된다. Pillow 가 없거나 디코딩에 실패하면 원본을 복사해 둔다.
+    tmp = dst + ".part"
+    try:
+        from PIL import Image
+
+        with Image.open(src) as img:
+            img.thumbnail((size, size))
+            img.save(tmp, format=img.format)
+    except Exception:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+    return dst
+
+
+def _get_thumbnail_executor():
+    global _thumbnail_executor
+    if _thumbnail_executor is None:
+        _thumbnail_executor = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS,
+                                                  mp_context=multiprocessing.get_context("spawn"))
+    return _thumbnail_executor
+
+
+async def _generate_thumbnail(src):
+    dst = thumbnail_path(src)
+    if os.path.exists(dst):
+        return
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_get_thumbnail_executor(), make_thumbnail, src, dst, THUMBNAIL_SIZE)
+    except Exception:
+        logger.exception("썸네일 생성 실패: %s", src)
+
+
+def shutdown():
+    global _thumbnail_executor
+    if _thumbnail_executor is not None:
+        _thumbnail_executor.shutdown(wait=False, cancel_futures=True)
+        _thumbnail_executor = None
+
+
+async def save_image(file: UploadFile) -> str:
+    """업로드를 청크 단위로 읽어 크기 제한/형식 확인을 하고, 내용 해시(sha256)로 이름을 붙여 저장한다.
+
+    같은 내용의 파일은 하나만 저장되고, 썸네일은 백그라운드 프로세스 풀에서 만든다.
+    """
+    if not file or not file.filename:
+        return ""
+    ext = os.path.splitext(file.filename)[1].lower()
+
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="이미지 파일(png, jpg,gif,jpeg)만 업로드 가능합니다.")
+
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    kind = None
+    fd, tmp_path = tempfile.mkstemp(dir=IMAGE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if kind is None:
+                    kind = sniff_image_type(chunk)
+                    if kind is None:
+                        raise HTTPException(status_code=400, detail="이미지 파일(png, jpg,gif,jpeg)만 업로드 가능합니다.")
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="이미지 파일이 너무 큽니다.")
+                digest.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+        if kind is None:
+            raise HTTPException(status_code=400, detail="빈 파일입니다.")
+
+        relpath = image_relpath(digest.hexdigest(), kind)
+        file_path = os.path.join(IMAGE_DIR, relpath)
+        if os.path.exists(file_path):
+            os.remove(tmp_path)  # 같은 내용이 이미 있으면 기존 파일을 공유
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    _schedule_thumbnail(file_path)
+    return f"{IMAGE_URL_PREFIX}{relpath}"
+
+
+def _schedule_thumbnail(src):
+    if src in _pending_thumbnails:
+        return
+    _pending_thumbnails.add(src)
+    task = asyncio.create_task(_generate_thumbnail(src))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(lambda _: _pending_thumbnails.discard(src))
+
+
+# --- 이미지 서빙 (ETag / 304 / Range) ---
+
+def _legacy_etag(path, st):
+    # 해시 이름이 아닌 예전 파일은 내용 해시를 한 번 계산해 (경로, mtime, 크기) 기준으로 캐시한다.
+    key = (path, st.st_mtime_ns, st.st_size)
+    etag = _legacy_etags.get(key)
+    if etag is None:
+        etag = f'"{file_digest(path)}"'
+        _legacy_etags.set(key, etag)
+    return etag
+
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def _parse_range(range_header, size):
+    # 단일 범위(bytes=a-b, bytes=a-, bytes=-n)만 지원한다. 형식이 맞지 않으면 None (전체 응답).
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            start, end = size - int(end_s), size - 1
+    except ValueError:
+        return None
+    start = max(start, 0)
+    end = min(end, size - 1)
+    if start > end:
+        raise HTTPException(status_code=416, detail="잘못된 Range 요청입니다.",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def _iter_file(path, start, end):
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def serve_image(image_path, request):
+    root = os.path.abspath(IMAGE_DIR)
+    path = os.path.abspath(os.path.join(root, image_path))
+    if not path.startswith(root + os.sep):
+        raise HTTPException(status_code=404, detail="이미지가 없습니다.")
+    name = os.path.basename(path)
+    match = HASHED_NAME.match(name)
+    pending_thumbnail = False
+    try:
+        st = os.stat(path)
+    except OSError:
+        if not (match and match.group(2)):
+            raise HTTPException(status_code=404, detail="이미지가 없습니다.")
+        # 썸네일이 아직 없으면(생성 중이거나 실패) 원본으로 대신 응답하고 생성을 다시 예약한다.
+        original = path[:-len(f"{THUMBNAIL_SUFFIX}.{match.group(3)}")] + f".{match.group(3)}"
+        try:
+            st = os.stat(original)
+        except OSError:
+            raise HTTPException(status_code=404, detail="이미지가 없습니다.")
+        _schedule_thumbnail(original)
+        path, name, match, pending_thumbnail = original, os.path.basename(original), None, True
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail="이미지가 없습니다.")
+
+    if pending_thumbnail:
+        # 곧 썸네일로 바뀌므로 immutable 로 캐시하면 안 된다.
+        etag = f'"{HASHED_NAME.match(name).group(1)}"'
+        cache_control = REVALIDATE_CACHE_CONTROL
+    elif match:
+        etag = f'"{match.group(1)}{match.group(2) or ""}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = await run_in_threadpool(_legacy_etag, path, st)
+        cache_control = REVALIDATE_CACHE_CONTROL
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    media_type = CONTENT_TYPES.get(os.path.splitext(name)[1].lower(), "application/octet-stream")
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _parse_range(range_header, st.st_size)
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(_iter_file(path, start, end), status_code=206,
+                                     headers=headers, media_type=media_type)
+
+    return FileResponse(path, headers=headers, media_type=media_type, stat_result=st)
@@ -0,0 +1,177 @@
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+slow_query_logger = logging.getLogger("app.slow_query")
+
+# 0 이면 느린 쿼리 로그를 남기지 않는다.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+class Histogram:
+    """Prometheus 텍스트 형식으로 내보내는 누적 버킷 히스토그램. 라벨 조합마다 버킷 배열 하나."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [버킷별 개수..., +Inf 개수, 합계]
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def totals(self):
+        """모든 라벨 조합을 합친 (관측 수, 합계)."""
+        with self._lock:
+            return (sum(series[-2] for series in self._series.values()),
+                    sum(series[-1] for series in self._series.values()))
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            base = list(zip(self.labelnames, labels))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_labels(base + [('le', str(bound))])} {count}")
+            lines.append(f"{self.name}_bucket{_labels(base + [('le', '+Inf')])} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(base)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_labels(base)} {series[-1]:.6f}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(list(zip(self.labelnames, labels)))} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+http_request_duration = Histogram("http_request_duration_seconds", "요청 처리 시간 (라우트 템플릿별)",
+                                  ("method", "route"))
+http_requests = Counter("http_requests_total", "처리한 요청 수", ("method", "route", "status"))
+db_queries_per_request = Histogram("db_queries_per_request", "요청 하나가 실행한 SQL 문 개수", ("route",),
+                                   QUERY_COUNT_BUCKETS)
+db_query_duration = Histogram("db_query_duration_seconds", "SQL 문 실행 시간 (문장별)", ("statement",))
+db_pool_wait = Histogram("db_pool_checkout_wait_seconds", "커넥션 풀에서 커넥션을 받기까지 기다린 시간")
+slow_queries = Counter("db_slow_queries_total", "SLOW_QUERY_MS 를 넘은 SQL 문 수", ("route",))
+
+_METRICS = [http_request_duration, http_requests, db_queries_per_request, db_query_duration, db_pool_wait,
+            slow_queries]
+# 이름 -> stats() 딕셔너리를 돌려주는 함수. 숫자 값만 gauge 로 내보낸다 (예: 세션 캐시 적중률).
+_GAUGE_SOURCES = {}
+
+
+def register_stats(prefix, stats):
+    _GAUGE_SOURCES[prefix] = stats
+
+
+# --- 요청 / SQL 계측 ---
+
+class RequestInfo:
+    def __init__(self, scope):
+        self.scope = scope
+
+    @property
+    def route(self):
+        # 라우팅이 끝난 뒤에는 scope["route"] 에 매칭된 라우트가 들어 있다 (/posts/{post_id} 형태).
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+
+_current_request = ContextVar("metrics_request", default=None)
+
+
+@contextmanager
+def track_request(scope):
+    info = RequestInfo(scope)
+    token = _current_request.set(info)
+    try:
+        yield info
+    finally:
+        _current_request.reset(token)
+
+
+def observe_request(info, method, status_code, seconds, query_count):
+    route = info.route
+    http_request_duration.observe(seconds, method, route)
+    http_requests.inc(method, route, str(status_code))
+    db_queries_per_request.observe(query_count, route)
+
+
+_WHITESPACE = re.compile(r"\s+")
+# expanding IN 파라미터는 값 개수마다 다른 SQL 이 되므로 (?, ?, ?) 를 (?) 하나로 접는다.
+_PARAM_LIST = re.compile(r"\bIN\s*\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)")
+
+
+def normalize_statement(statement):
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _PARAM_LIST.sub("IN (?)", statement)[:200]
+
+
+def observe_query(statement, seconds):
+    statement = normalize_statement(statement)
+    db_query_duration.observe(seconds, statement)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        info = _current_request.get()
+        route = info.route if info is not None else "background"
+        slow_queries.inc(route)
+        slow_query_logger.warning("slow query %.1fms route=%s sql=%s", seconds * 1000, route, statement)
+
+
+def observe_pool_wait(seconds):
+    db_pool_wait.observe(seconds)
+
+
+def render():
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for prefix, stats in _GAUGE_SOURCES.items():
+        for key, value in stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = f"{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
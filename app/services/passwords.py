@@ -0,0 +1,71 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from fastapi import HTTPException
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+class PasswordHasher:
+    """bcrypt 연산을 요청 워커 밖(프로세스 풀)에서 실행한다.
+
+    대기 + 실행 중인 작업이 max_pending 을 넘으면 줄을 세우지 않고 바로 503 을 돌려준다.
+    workers=0 이면 이벤트 루프의 기본 스레드풀을 쓴다 (bcrypt 는 GIL 을 놓는다).
+    """
+
+    def __init__(self, workers, max_pending, rounds=BCRYPT_ROUNDS):
+        self.workers = workers
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(status_code=503, detail="요청이 많습니다. 잠시 후 다시 시도해주세요.",
+                                headers={"Retry-After": "1"})
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password):
+        return await self._submit(_hash, password, self.rounds)
+
+    async def verify(self, password, hashed):
+        return await self._submit(_check, password, hashed)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1))),
+    max_pending=int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64")),
+)
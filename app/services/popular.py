@@ -0,0 +1,159 @@
+import asyncio
+import bisect
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# 이 배수만큼 반감기가 지나면 점수를 현재 시각 기준으로 다시 나눠 float 가 커지지 않게 한다.
+RENORMALIZE_AFTER = 64
+
+
+class PopularPosts:
+    """좋아요/댓글/조회 이벤트로 점수를 매긴 인기 게시글 순위. 워커 프로세스마다 하나씩 존재한다.
+
+    점수는 forward decay 로 계산한다: 이벤트 하나의 점수 = 가중치 * 2^((발생 시각 - 기준 시각) / 반감기).
+    오래된 이벤트를 깎는 대신 새 이벤트를 크게 더하므로 시간이 흘러도 기존 점수를 다시 계산할 필요가 없고,
+    순위는 "현재 시각 기준으로 반감기마다 절반이 되는 점수" 순위와 같다.
+
+    - _ranked 는 (-점수, post_id) 정렬 리스트라서 상위 N 개는 앞에서 N 개를 자르면 된다.
+    - 추적하는 게시글은 max_tracked 개까지. 넘치면 점수가 가장 낮은 게시글을 버린다.
+    - 응답에 필요한 게시글 요약(_summaries)도 같이 들고 있어서 조회 시 DB 를 쓰지 않는다.
+    - 다른 워커가 처리한 이벤트는 rebuild_interval 마다 DB 에서 다시 만들 때 반영된다.
+    """
+
+    def __init__(self, half_life, weights, max_tracked, rebuild_interval):
+        self.half_life = half_life
+        self.weights = weights
+        self.max_tracked = max_tracked
+        self.rebuild_interval = rebuild_interval
+        self.epoch = time.time()
+        self.rebuilt_at = None
+        self._scores = {}
+        self._ranked = []
+        self._summaries = {}
+        self._authors = {}
+        self._task = None
+
+    def weight(self, kind, at, epoch=None):
+        return self.weights[kind] * 2 ** ((at - (self.epoch if epoch is None else epoch)) / self.half_life)
+
+    def record(self, post_id, kind, sign=1, at=None):
+        """이벤트 하나를 반영한다. 좋아요 취소처럼 되돌리는 이벤트는 sign=-1."""
+        at = time.time() if at is None else at
+        if at - self.epoch > RENORMALIZE_AFTER * self.half_life:
+            self._renormalize(at)
+        old = self._scores.get(post_id)
+        new = (old or 0.0) + sign * self.weight(kind, at)
+        if old is None and (new <= 0 or (len(self._ranked) >= self.max_tracked and new <= -self._ranked[-1][0])):
+            # 순위 밖에서 들어오자마자 밀려날 게시글은 추적하지 않는다 (요약 조회도 생기지 않음).
+            return
+        if old is not None:
+            del self._ranked[bisect.bisect_left(self._ranked, (-old, post_id))]
+        if new <= 0:
+            self.forget(post_id)
+            return
+        self._scores[post_id] = new
+        bisect.insort(self._ranked, (-new, post_id))
+        if len(self._ranked) > self.max_tracked:
+            self.forget(self._ranked[-1][1])
+
+    def _renormalize(self, at):
+        factor = 2 ** ((at - self.epoch) / self.half_life)
+        self._scores = {post_id: score / factor for post_id, score in self._scores.items()}
+        self._ranked = [(negated / factor, post_id) for negated, post_id in self._ranked]
+        self.epoch = at
+
+    def needs_summary(self, post_id):
+        return post_id in self._scores and post_id not in self._summaries
+
+    def set_summary(self, post_id, item, author_id):
+        if post_id in self._scores:
+            self._summaries[post_id] = item
+            self._authors[post_id] = author_id
+
+    def update_summary(self, post_id, **fields):
+        item = self._summaries.get(post_id)
+        if item is not None:
+            item.update(fields)
+
+    def add_count(self, post_id, field, delta):
+        item = self._summaries.get(post_id)
+        if item is not None:
+            item[field] += delta
+
+    def rename_author(self, author_id, nickname):
+        for post_id, author in self._authors.items():
+            if author == author_id:
+                self._summaries[post_id]["author_nickname"] = nickname
+
+    def forget(self, post_id):
+        score = self._scores.pop(post_id, None)
+        if score is not None:
+            index = bisect.bisect_left(self._ranked, (-score, post_id))
+            if index < len(self._ranked) and self._ranked[index][1] == post_id:
+                del self._ranked[index]
+        self._summaries.pop(post_id, None)
+        self._authors.pop(post_id, None)
+
+    def top(self, n):
+        results = []
+        for _, post_id in self._ranked:
+            if len(results) == n:
+                break
+            item = self._summaries.get(post_id)
+            if item is not None:
+                results.append(item)
+        return results
+
+    def replace(self, epoch, scores, summaries):
+        """DB 에서 새로 계산한 상태로 통째로 바꾼다. scores: {post_id: 점수}, summaries: {post_id: (요약, 작성자 id)}."""
+        scores = {post_id: score for post_id, score in scores.items() if post_id in summaries}
+        self.epoch = epoch
+        self._scores = scores
+        self._ranked = sorted((-score, post_id) for post_id, score in scores.items())
+        self._summaries = {post_id: item for post_id, (item, _) in summaries.items() if post_id in scores}
+        self._authors = {post_id: author for post_id, (_, author) in summaries.items() if post_id in scores}
+        self.rebuilt_at = time.time()
+
+    async def _run(self, rebuild):
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await rebuild()
+            except Exception:
+                logger.exception("인기 게시글 재계산 실패")
+
+    def start(self, rebuild):
+        if self._task is None and self.rebuild_interval > 0:
+            self._task = asyncio.create_task(self._run(rebuild))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "tracked": len(self._ranked),
+            "max_tracked": self.max_tracked,
+            "summaries": len(self._summaries),
+            "rebuild_age_seconds": round(time.time() - self.rebuilt_at, 1) if self.rebuilt_at else -1,
+        }
+
+
+popular_posts = PopularPosts(
+    half_life=float(os.getenv("POPULAR_HALF_LIFE_HOURS", "24")) * 3600,
+    weights={
+        "like": float(os.getenv("POPULAR_WEIGHT_LIKE", "3")),
+        "comment": float(os.getenv("POPULAR_WEIGHT_COMMENT", "5")),
+        "view": float(os.getenv("POPULAR_WEIGHT_VIEW", "1")),
+    },
+    max_tracked=int(os.getenv("POPULAR_MAX_TRACKED", "5000")),
+    rebuild_interval=float(os.getenv("POPULAR_REBUILD_INTERVAL", "600")),
+)
@@ -0,0 +1,232 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote_to_bytes
+
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+from python_multipart import MultipartParser, QuerystringParser
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import parse_options_header
+
+from app.services import metrics
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# 프록시(nginx 등) 뒤에 있을 때만 켠다. 켜면 X-Forwarded-For 의 마지막 값(프록시가 본 주소)을 클라이언트 IP 로 쓴다.
+TRUST_FORWARDED_FOR = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+BUCKETS_PER_LIMITER = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+def parse_rate(spec):
+    """"10/minute" -> (초당 토큰 수, 버킷 크기). 버킷 크기는 기간당 허용 횟수와 같다."""
+    count, period = spec.split("/")
+    count = int(count)
+    return count / PERIODS[period], count
+
+
+class RateLimiter:
+    """키(IP, 이메일 등)별 토큰 버킷. 워커 프로세스마다 하나씩 존재한다.
+
+    버킷은 (남은 토큰, 마지막 갱신 시각) 두 값뿐이고 요청마다 그 자리에서 채워 넣으므로 타이머가 필요 없다.
+    키 수가 maxsize 를 넘으면 가장 오래 안 쓰인 버킷부터 버린다. 버려진 키는 다시 가득 찬 버킷으로 시작한다.
+    """
+
+    def __init__(self, name, spec, maxsize=BUCKETS_PER_LIMITER):
+        self.name = name
+        self.rate, self.burst = parse_rate(spec)
+        self.maxsize = maxsize
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        metrics.register_stats(f"ratelimit_{name}", self.stats)
+
+    def acquire(self, key):
+        """토큰이 있으면 하나 쓰고 0 을, 없으면 다음 토큰까지 남은 초를 돌려준다."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                self._buckets.move_to_end(key)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.rejected += 1
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            self.allowed += 1
+            return 0
+
+    def check(self, key):
+        if not RATE_LIMIT_ENABLED:
+            return
+        wait = self.acquire(key)
+        if wait:
+            raise HTTPException(status_code=429, detail="요청이 너무 많습니다. 잠시 후 다시 시도해주세요.",
+                                headers={"Retry-After": str(math.ceil(wait))})
+
+    def by_ip(self):
+        """라우트의 dependencies=[Depends(limiter.by_ip())] 로 쓰는 IP 기준 제한."""
+        async def dependency(request: Request):
+            self.check(client_ip(request))
+        return dependency
+
+    def by_form_field(self, field, key=lambda value: value):
+        """폼(multipart, urlencoded)의 field 값 기준 제한. add_api_route(..., route_class_override=...) 로 쓰는 APIRoute 클래스.
+
+        Form 파라미터가 있는 라우트는 본문(업로드 파일 포함)을 다 파싱한 뒤에야 엔드포인트와 Depends 가 돌므로,
+        본문을 읽는 도중 field 파트가 도착하면 바로 검사해 뒤따르는 파일 파트를 받기 전에 429 로 끊는다.
+        """
+        limiter = self
+
+        class FormFieldLimitedRequest(Request):
+            async def stream(self):
+                reader = _FormFieldReader(self.headers.get("content-type", ""), field)
+                async for chunk in super().stream():
+                    value = reader.feed(chunk)
+                    if value is not None:
+                        limiter.check(key(value))
+                    yield chunk
+                value = reader.finish()
+                if value is not None:
+                    limiter.check(key(value))
+
+        class FormFieldLimitedRoute(APIRoute):
+            def get_route_handler(self):
+                handler = super().get_route_handler()
+
+                async def limited_handler(request: Request):
+                    return await handler(FormFieldLimitedRequest(request.scope, request.receive))
+                return limited_handler
+
+        return FormFieldLimitedRoute
+
+    def stats(self):
+        return {
+            "size": len(self._buckets),
+            "maxsize": self.maxsize,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+
+class _FormFieldReader:
+    """폼 본문 조각을 받으면서 이름이 field 인 (파일이 아닌) 값 하나만 뽑는다. 값이 다 모인 시점에 한 번 돌려준다."""
+
+    MAX_VALUE_BYTES = 1024
+
+    def __init__(self, content_type, field):
+        kind, params = parse_options_header(content_type)
+        self.field = field.encode()
+        self.done = False
+        self.value = None
+        self._header_name = self._header_value = self._disposition = self._name = b""
+        self._data = None  # 찾는 값을 읽는 중일 때만 bytearray
+        if kind == b"multipart/form-data" and b"boundary" in params:
+            self._parser = MultipartParser(params[b"boundary"], {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_data,
+                "on_part_end": self._on_end,
+            })
+        elif kind == b"application/x-www-form-urlencoded":
+            self._parser = QuerystringParser({
+                "on_field_start": self._on_field_start,
+                "on_field_name": self._on_field_name,
+                "on_field_data": self._on_field_data,
+                "on_field_end": self._on_end,
+            })
+        else:
+            self.done = True
+
+    def feed(self, chunk):
+        if self.done:
+            return None
+        try:
+            self._parser.write(chunk)
+        except FormParserError:
+            # 잘못된 본문은 Starlette 파서가 400 으로 거절하게 둔다.
+            self.done = True
+        return self.value if self.done else None
+
+    def finish(self):
+        """본문이 끝났을 때 호출한다. urlencoded 의 마지막 값은 이때 확정된다."""
+        if self.done:
+            return None
+        try:
+            self._parser.finalize()
+        except FormParserError:
+            pass
+        self.done = True
+        return self.value
+
+    def _on_part_begin(self):
+        self._disposition = b""
+
+    def _on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if options.get(b"name") == self.field and b"filename" not in options:
+            self._data = bytearray()
+
+    def _on_field_start(self):
+        self._name = b""
+
+    def _on_field_name(self, data, start, end):
+        self._name += data[start:end]
+
+    def _on_field_data(self, data, start, end):
+        if self._data is None and unquote_to_bytes(self._name.replace(b"+", b" ")) == self.field:
+            self._data = bytearray()
+        self._on_data(data, start, end)
+
+    def _on_data(self, data, start, end):
+        if self._data is not None:
+            self._data += data[start:end]
+            if len(self._data) > self.MAX_VALUE_BYTES:
+                self.done = True
+
+    def _on_end(self):
+        if self._data is None or self.done:
+            return
+        value = bytes(self._data)
+        if isinstance(self._parser, QuerystringParser):
+            value = unquote_to_bytes(value.replace(b"+", b" "))
+        self.value = value.decode("utf-8", errors="replace")
+        self.done = True
+
+
+def client_ip(request):
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def email_key(email):
+    return email.strip().casefold()
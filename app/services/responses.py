@@ -0,0 +1,110 @@
+import gzip
+import hashlib
+import os
+
+import anyio
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # pip install .[compression]
+    brotli = None
+
+# 이보다 작은 응답은 압축해도 헤더/CPU 비용에 비해 줄어드는 바이트가 적으므로 그대로 보낸다.
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+_stats = {"total": 0, "not_modified": 0, "compressed": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def weak_etag(*versions):
+    """응답을 만드는 값(조회한 행들 + 보는 사람 등)으로 만든 weak ETag. 본문을 만들기 전에 계산한다.
+
+    updated_at 은 쓰기 경로에서 갱신하지 않으므로 행 값(id, 카운터, 제목/내용, 이미지 경로 등) 자체를 버전으로 쓴다.
+    응답의 나머지 값(썸네일 URL 등)은 행 값만으로 정해져야 한다. 압축 방식이 달라도 같은 태그라 weak(W/) 다.
+    """
+    return f'W/"{hashlib.blake2b(repr(versions).encode(), digest_size=12).hexdigest()}"'
+
+
+def not_modified(request, etag):
+    # If-None-Match 는 weak 비교다: W/ 접두사는 무시하고 태그 값만 비교한다.
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def choose_encoding(accept_encoding):
+    """Accept-Encoding 에서 br(설치되어 있을 때) > gzip 순으로 고른다. q=0 은 거절로 본다."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        try:
+            q = float(params.strip().removeprefix("q=")) if params.strip() else 1.0
+        except ValueError:
+            q = 1.0
+        if coding.strip() and q > 0:
+            accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def json_response(request, body, etag, headers=None, private=False, encoded=None):
+    """조건부 GET(304)과 압축을 처리한 JSON 응답.
+
+    body 는 직렬화된 bytes 이거나, bytes 를 돌려주는 함수다. 함수면 304 일 때 응답 dict 생성/직렬화를 하지 않는다.
+    encoded 에 dict 를 넘기면 인코딩별 압축 결과를 거기에 저장/재사용한다 (캐시된 본문용).
+    """
+    headers = dict(headers or {})
+    headers["ETag"] = etag
+    # 클라이언트는 매번 재검증한다. 로그인 사용자별로 달라지는 응답(is_owner 등)은 공유 캐시에 두지 않는다.
+    headers["Cache-Control"] = "private, no-cache" if private else "no-cache"
+    headers["Vary"] = "Accept-Encoding, Cookie" if private else "Accept-Encoding"
+    _stats["total"] += 1
+    if not_modified(request, etag):
+        _stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+
+    if callable(body):
+        body = body()
+    _stats["bytes_in"] += len(body)
+    encoding = choose_encoding(request.headers.get("accept-encoding")) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding is not None:
+        compressed = encoded.get(encoding) if encoded is not None else None
+        if compressed is None:
+            compressed = compress(body, encoding)
+            if encoded is not None:
+                encoded[encoding] = compressed
+        body = compressed
+        headers["Content-Encoding"] = encoding
+        _stats["compressed"] += 1
+    _stats["bytes_out"] += len(body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """클라이언트가 끊어서 전송이 취소돼도 본문 생성기를 바로 닫는다 (생성기가 연 DB 커넥션을 GC 전에 반납)."""
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+def stats():
+    return dict(_stats)
@@ -0,0 +1,375 @@
+import asyncio
+import bisect
+import logging
+import os
+import re
+import sys
+import time
+from array import array
+from collections import Counter
+from operator import itemgetter
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.db import connect
+from app.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+GRAM = 2
+# 제목에서 맞은 n-gram 은 본문보다 이만큼 더 쳐준다.
+TITLE_WEIGHT = 2
+# 주기적 갱신 때 마지막으로 본 id 보다 이만큼 앞에서부터 다시 읽는다 (늦게 커밋된 작은 id 의 글을 놓치지 않도록).
+REFRESH_OVERLAP_IDS = 1000
+# 최고 점수 글만으로 페이지를 채울 때 가장 짧은 목록에서 최대 이만큼만 훑는다 (모자라면 전체 순위를 만든다).
+EARLY_EXIT_SCAN = 2000
+# 가장 짧은 목록이 이보다 짧으면 전체 순위도 금방 만들어지므로 바로 전체 순위를 만든다.
+EARLY_EXIT_MIN_POSTINGS = 1000
+WORD = re.compile(r"\w+")
+EMPTY = array("I")
+
+
+def grams(value):
+    """소문자화한 단어마다 글자 2-gram. 한글은 형태소 분석 없이도 부분 문자열이 잘 걸린다. 1글자 단어는 버린다."""
+    result = set()
+    for word in WORD.findall(value.casefold()):
+        for i in range(len(word) - GRAM + 1):
+            result.add(word[i:i + GRAM])
+    return result
+
+
+def _contains(postings, post_id):
+    i = bisect.bisect_left(postings, post_id)
+    return i < len(postings) and postings[i] == post_id
+
+
+def _insert(index, gram, post_id):
+    postings = index.get(gram)
+    if postings is None:
+        index[gram] = array("I", (post_id,))
+    elif not postings or postings[-1] < post_id:
+        postings.append(post_id)  # 새 글은 id 가 가장 크므로 대부분 끝에 붙는다.
+    elif not _contains(postings, post_id):
+        postings.insert(bisect.bisect_left(postings, post_id), post_id)
+
+
+def _intersect(ids, postings):
+    # 후보가 목록보다 훨씬 적으면 후보마다 이진 탐색하고, 아니면 목록을 한 번 훑는다 (set 연산이라 C 에서 돈다).
+    if len(ids) * 16 < len(postings):
+        return {post_id for post_id in ids if _contains(postings, post_id)}
+    return ids.intersection(postings)
+
+
+def _delete(index, gram, post_id):
+    postings = index.get(gram)
+    if postings is None:
+        return
+    i = bisect.bisect_left(postings, post_id)
+    if i < len(postings) and postings[i] == post_id:
+        del postings[i]
+        if not postings:
+            del index[gram]
+
+
+class Ranking:
+    """검색 결과 전체 순위. (점수, id) 내림차순으로 두 배열에 나눠 담는다 (글 하나에 8바이트)."""
+
+    def __init__(self, scores, ids):
+        self.scores = scores
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def page(self, limit, after=None):
+        """after(이전 페이지 마지막 항목의 (점수, id)) 다음부터 limit 개와, 다음 페이지가 있는지."""
+        start = 0
+        if after is not None:
+            start = bisect.bisect_left(range(len(self.ids)), True, key=lambda i: (self.scores[i], self.ids[i]) < after)
+        end = start + limit
+        return list(zip(self.scores[start:end], self.ids[start:end])), end < len(self.ids)
+
+
+EMPTY_RANKING = Ranking(array("I"), array("I"))
+
+
+def rank_postings(postings):
+    """검색어의 n-gram 을 모두 포함하는 글 전체의 순위. postings 는 길이순으로 정렬한 n-gram 별 (제목, 본문) 목록.
+
+    점수 = 제목에서 맞은 n-gram 수 * TITLE_WEIGHT + 본문에서 맞은 수. 같은 점수는 최신 글(id 큰 순)이 먼저다.
+    """
+    if not postings:
+        return EMPTY_RANKING
+    # 가장 짧은 목록부터 후보를 줄여 나가고, 후보가 없어지면 바로 끝낸다.
+    candidates = None
+    for in_title, in_content in postings:
+        if candidates is None:
+            candidates = set(in_title)
+            candidates.update(in_content)
+        else:
+            matched = _intersect(candidates, in_title)
+            matched.update(_intersect(candidates, in_content))
+            candidates = matched
+        if not candidates:
+            return EMPTY_RANKING
+
+    # 제목에 하나도 안 걸린 글은 모든 n-gram 이 본문에 있으므로 점수가 정확히 n-gram 수(base)이고 순서는 id 만으로 정해진다.
+    # 본문 적중 수는 제목에 걸린 글만 센다 (본문 목록 전체를 세는 것보다 훨씬 적다).
+    base = len(postings)
+    scores = Counter()
+    for in_title, _ in postings:
+        matched = _intersect(candidates, in_title)
+        for _ in range(TITLE_WEIGHT):
+            scores.update(matched)
+    titled = set(scores)
+    if titled:
+        for _, in_content in postings:
+            scores.update(_intersect(titled, in_content))
+    # 정렬/변환은 모두 C 에서 돈다 (글마다 파이썬 코드를 실행하지 않음).
+    ranked = sorted(zip(scores.values(), scores.keys()), reverse=True)
+    rest = sorted(candidates.difference(titled), reverse=True)
+    ranked_scores = array("I", map(itemgetter(0), ranked))
+    ranked_scores.extend(array("I", (base,)) * len(rest))
+    ranked_ids = array("I", map(itemgetter(1), ranked))
+    ranked_ids.extend(rest)
+    return Ranking(ranked_scores, ranked_ids)
+
+
+class SearchIndex:
+    """n-gram -> 정렬된 post_id 배열(array('I'), id 하나에 4바이트). 제목과 본문을 따로 둔다.
+
+    글 하나를 지우거나 고칠 때는 그 글의 (이전) 제목/본문으로 n-gram 을 다시 계산해서 해당 배열에서만 뺀다.
+    """
+
+    def __init__(self):
+        self.title = {}
+        self.content = {}
+        self.docs = 0
+        self.last_id = 0
+        self.version = 0  # add/remove 때마다 1 씩 늘어난다 (캐시한 순위가 최신인지 확인용)
+        self._live = bytearray()
+
+    def is_live(self, post_id):
+        byte = post_id >> 3
+        return byte < len(self._live) and bool(self._live[byte] & (1 << (post_id & 7)))
+
+    def _set_live(self, post_id, live):
+        byte = post_id >> 3
+        if byte >= len(self._live):
+            self._live.extend(bytes(max(byte + 1 - len(self._live), len(self._live))))
+        if live:
+            self._live[byte] |= 1 << (post_id & 7)
+        else:
+            self._live[byte] &= ~(1 << (post_id & 7)) & 0xFF
+
+    def add(self, post_id, title, content):
+        if self.is_live(post_id):
+            return
+        for gram in grams(title):
+            _insert(self.title, gram, post_id)
+        for gram in grams(content or ""):
+            _insert(self.content, gram, post_id)
+        self._set_live(post_id, True)
+        self.docs += 1
+        self.version += 1
+        self.last_id = max(self.last_id, post_id)
+
+    def remove(self, post_id, title, content):
+        if not self.is_live(post_id):
+            return
+        for gram in grams(title):
+            _delete(self.title, gram, post_id)
+        for gram in grams(content or ""):
+            _delete(self.content, gram, post_id)
+        self._set_live(post_id, False)
+        self.docs -= 1
+        self.version += 1
+
+    def search(self, query, limit, after=None):
+        return self.top_page(query, limit, after) or self.rank(query).page(limit, after)
+
+    def top_page(self, query, limit, after=None):
+        """모든 n-gram 이 제목과 본문 양쪽에 있는 글(최고 점수)만으로 페이지가 채워지면 전체 순위 없이 돌려준다.
+
+        그보다 높은 점수는 없고 같은 점수끼리는 id 큰 순이므로, 가장 짧은 목록을 뒤에서부터 훑으며 나머지 목록에
+        모두 있는 글을 limit + 1 개 찾으면 rank().page() 와 같은 결과다. 못 채우면 None.
+        """
+        query_grams = grams(query)
+        if not query_grams:
+            return None
+        top = len(query_grams) * (TITLE_WEIGHT + 1)
+        if after is not None and after[0] != top:
+            return None
+        postings = sorted((index.get(g, EMPTY) for g in query_grams for index in (self.title, self.content)), key=len)
+        shortest, others = postings[0], postings[1:]
+        if len(shortest) < EARLY_EXIT_MIN_POSTINGS:
+            return None
+        end = len(shortest) if after is None else bisect.bisect_left(shortest, after[1])
+        page = []
+        for i in range(end - 1, max(end - EARLY_EXIT_SCAN, 0) - 1, -1):
+            post_id = shortest[i]
+            if all(_contains(p, post_id) for p in others):
+                if len(page) == limit:
+                    return page, True
+                page.append((top, post_id))
+        return None
+
+    def rank(self, query):
+        return rank_postings(self._postings(query))
+
+    def snapshot(self, query):
+        """검색어의 n-gram 별 (제목, 본문) 목록을 복사한다. 이벤트 루프에서 불러서 스레드풀의 rank_postings() 에 넘긴다.
+
+        색인 배열은 작성/수정/삭제 때 이벤트 루프에서 바로 고쳐지므로 다른 스레드가 원본을 읽으면 안 된다.
+        """
+        return [(in_title[:], in_content[:]) for in_title, in_content in self._postings(query)]
+
+    def _postings(self, query):
+        return sorted(((self.title.get(g, EMPTY), self.content.get(g, EMPTY)) for g in grams(query)),
+                      key=lambda pair: len(pair[0]) + len(pair[1]))
+
+    def memory_bytes(self):
+        total = sys.getsizeof(self.title) + sys.getsizeof(self.content) + sys.getsizeof(self._live)
+        for index in (self.title, self.content):
+            for gram, postings in index.items():
+                total += sys.getsizeof(gram) + sys.getsizeof(postings)
+        return total
+
+    def postings(self):
+        return sum(len(p) for p in self.title.values()) + sum(len(p) for p in self.content.values())
+
+
+class PostSearch:
+    """게시글 검색 색인. 워커 프로세스마다 하나씩 존재한다.
+
+    - 시작할 때 삭제되지 않은 글을 id 순으로 스트리밍하며 색인을 만든다.
+    - 같은 워커의 작성/수정/삭제는 컨트롤러가 add/update/remove 로 바로 반영한다.
+    - refresh_interval 마다 마지막으로 본 id 이후의 새 글(다른 워커에서 작성)을 더하고,
+      rebuild_interval 마다 새 색인을 만들어 바꿔 끼운다 (다른 워커의 수정/삭제 반영).
+      다시 만드는 동안 들어온 변경은 기록해 두었다가 바꿔 끼운 뒤 다시 적용한다.
+    """
+
+    def __init__(self, refresh_interval, rebuild_interval, cache_size, cache_ttl):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.index = SearchIndex()
+        self.builds = 0
+        self.recomputed = 0
+        self.early_exits = 0
+        # 검색어(n-gram 집합) -> ((builds, version), 전체 순위). 다음 페이지 요청은 다시 계산하지 않고 여기서 자른다.
+        self.rankings = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.ready = False
+        self.build_seconds = 0.0
+        self._journal = None
+        self._task = None
+
+    def add(self, post_id, title, content):
+        self._apply("add", post_id, title, content)
+
+    def update(self, post_id, old_title, old_content, title, content):
+        self._apply("remove", post_id, old_title, old_content)
+        self._apply("add", post_id, title, content)
+
+    def remove(self, post_id, title, content):
+        self._apply("remove", post_id, title, content)
+
+    def _apply(self, op, post_id, title, content):
+        getattr(self.index, op)(post_id, title, content)
+        if self._journal is not None:
+            self._journal.append((op, post_id, title, content))
+
+    async def search(self, query, limit, after=None):
+        """첫 페이지는 색인이 바뀌었으면 순위를 다시 계산하고, 다음 페이지(after)는 캐시에 남아 있는 동안
+        첫 페이지 때의 순위를 그대로 이어서 쓴다 (페이지 사이에 순서가 바뀌어 중복/누락되지 않도록).
+
+        색인 배열은 이벤트 루프에서만 읽는다 (작성/수정/삭제가 루프에서 배열을 바로 고치므로).
+        최고 점수 글만으로 채워지는 페이지(흔한 검색어)는 루프에서 바로 찾고 (SearchIndex.top_page, 훑는 양이 제한됨),
+        전체 순위는 검색어의 목록만 복사해서 스레드풀에서 만든다.
+        """
+        index = self.index
+        key = tuple(sorted(grams(query)))
+        state = (self.builds, index.version)
+        cached = self.rankings.get(key)
+        if cached is not None and (after is not None or cached[0] == state):
+            return cached[1].page(limit, after)
+        page = index.top_page(query, limit, after)
+        if page is not None:
+            self.early_exits += 1
+            return page
+        ranking = await run_in_threadpool(rank_postings, index.snapshot(query))
+        self.recomputed += 1
+        self.rankings.set(key, (state, ranking))
+        return ranking.page(limit, after)
+
+    async def build(self):
+        started = time.perf_counter()
+        self._journal = []
+        try:
+            index = SearchIndex()
+            await self._fill(index, 0)
+            for op, post_id, title, content in self._journal:
+                getattr(index, op)(post_id, title, content)
+            self.index = index
+            self.builds += 1
+        finally:
+            self._journal = None
+        self.ready = True
+        self.build_seconds = time.perf_counter() - started
+        logger.info("검색 색인: 글 %d개, %.1fs", index.docs, self.build_seconds)
+
+    async def refresh(self):
+        await self._fill(self.index, max(0, self.index.last_id - REFRESH_OVERLAP_IDS))
+
+    async def _fill(self, index, after_id):
+        async with connect() as db:
+            result = await db.stream(text("SELECT id, title, contents FROM posts "
+                                          "WHERE id > :after AND deleted_at IS NULL ORDER BY id"),
+                                     {"after": after_id})
+            async for row in result:
+                index.add(row.id, row.title, row.contents)
+
+    async def _run(self):
+        last_build = time.monotonic()
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                if self.rebuild_interval > 0 and time.monotonic() - last_build >= self.rebuild_interval:
+                    await self.build()
+                    last_build = time.monotonic()
+                else:
+                    await self.refresh()
+            except Exception:
+                logger.exception("검색 색인 갱신 실패")
+
+    def start(self):
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "ready": int(self.ready),
+            "docs": self.index.docs,
+            "grams": len(self.index.title) + len(self.index.content),
+            "build_seconds": round(self.build_seconds, 2),
+            "cached_rankings": self.rankings.stats()["size"],
+            "recomputed": self.recomputed,
+            "early_exits": self.early_exits,
+        }
+
+
+post_search = PostSearch(
+    refresh_interval=float(os.getenv("SEARCH_REFRESH_INTERVAL", "30")),
+    rebuild_interval=float(os.getenv("SEARCH_REBUILD_INTERVAL", "3600")),
+    cache_size=int(os.getenv("SEARCH_CACHE_SIZE", "64")),
+    cache_ttl=float(os.getenv("SEARCH_CACHE_TTL", "60")),
+)
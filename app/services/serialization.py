@@ -0,0 +1,31 @@
+import json
+from datetime import date
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pip install .[fast-json]
+    orjson = None
+
+
+def _default(obj):
+    # 기존 응답과 같은 형식("2024-01-01 12:00:00")을 유지하려고 날짜는 str() 로 내보낸다.
+    if isinstance(obj, date):
+        return str(obj)
+    raise TypeError(f"{type(obj).__name__} 는 JSON 으로 직렬화할 수 없습니다.")
+
+
+if orjson is not None:
+    def dumps(payload):
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+else:
+    def dumps(payload):
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """jsonable_encoder 를 거치지 않고 orjson(없으면 stdlib json)으로 바로 bytes 를 만든다."""
+
+    def render(self, content):
+        return dumps(content)
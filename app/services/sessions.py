@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import bindparam, text
+
+from app.db import connect
+
+logger = logging.getLogger(__name__)
+
+# 세션 유효 기간(초). 남은 시간이 SESSION_RENEW_AFTER 보다 적을 때만 만료 시각을 다시 미뤄서 요청마다 UPDATE 하지 않는다.
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+SESSION_RENEW_AFTER = int(os.getenv("SESSION_RENEW_AFTER", str(SESSION_TTL // 2)))
+MAX_SESSIONS_PER_USER = int(os.getenv("MAX_SESSIONS_PER_USER", "10"))
+
+
+def now():
+    return int(time.time())
+
+
+def new_expiry():
+    return now() + SESSION_TTL
+
+
+def needs_renewal(expires):
+    return expires - now() < SESSION_RENEW_AFTER
+
+
+class SessionSweeper:
+    """만료된 세션을 작은 묶음으로 나눠 지운다. 한 트랜잭션이 오래 락을 잡지 않도록 batch_size 씩 커밋한다.
+
+    예전에 expires = 0 으로 만들어진 세션도 만료된 것으로 보고 함께 정리된다.
+    """
+
+    def __init__(self, interval, batch_size, pause):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._task = None
+
+    async def sweep(self):
+        select_sql = text("SELECT session_id FROM sessions WHERE expires < :now LIMIT :limit")
+        delete_sql = text("DELETE FROM sessions WHERE session_id IN :ids").bindparams(
+            bindparam("ids", expanding=True))
+        deleted = 0
+        cutoff = now()
+        while True:
+            async with connect() as db:
+                rows = (await db.execute(select_sql, {"now": cutoff, "limit": self.batch_size})).fetchall()
+                if rows:
+                    await db.execute(delete_sql, {"ids": [r.session_id for r in rows]})
+                    await db.commit()
+            deleted += len(rows)
+            if len(rows) < self.batch_size:
+                return deleted
+            await asyncio.sleep(self.pause)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                deleted = await self.sweep()
+                if deleted:
+                    logger.info("만료 세션 %d개 삭제", deleted)
+            except Exception:
+                logger.exception("세션 정리 실패")
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+session_sweeper = SessionSweeper(
+    interval=float(os.getenv("SESSION_SWEEP_INTERVAL", "60")),
+    batch_size=int(os.getenv("SESSION_SWEEP_BATCH", "500")),
+    pause=float(os.getenv("SESSION_SWEEP_PAUSE", "0.05")),
+)
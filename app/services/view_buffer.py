@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import IntegrityError
+
+from app.db import connect
+from app.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    """게시글 조회 기록을 메모리에 모았다가 주기적으로 한 번에 DB 에 반영한다 (write-behind).
+
+    - 같은 (user, post) 쌍은 버퍼 안에서, 그리고 최근에 반영한 쌍(seen)으로 한 번 더 걸러낸다.
+    - flush 때 views 테이블에 이미 있는 쌍을 제외하고 INSERT 를 묶어서 실행하고,
+      게시글마다 views_count = views_count + N 을 한 번만 실행한다.
+    - 상세 조회는 DB 카운터 + 아직 반영되지 않은 조회 수를 낙관적으로 보여준다.
+    """
+
+    def __init__(self, flush_interval, max_pending, seen_size):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = set()
+        self._pending_counts = Counter()
+        self._seen = TTLCache(maxsize=seen_size, ttl=24 * 3600)
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+
+    def record(self, user_id, post_id):
+        key = (user_id, post_id)
+        if key in self._pending or self._seen.get(key):
+            return False
+        self._pending.add(key)
+        self._pending_counts[post_id] += 1
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+        return True
+
+    def pending_views(self, post_id):
+        return self._pending_counts.get(post_id, 0)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, set()
+            counts, self._pending_counts = self._pending_counts, Counter()
+            try:
+                written = await self._write(batch)
+            except Exception:
+                # 실패한 배치는 버퍼로 되돌려 다음 주기에 다시 시도한다.
+                self._pending |= batch
+                self._pending_counts.update(counts)
+                raise
+            for key in batch:
+                self._seen.set(key, True)
+            return written
+
+    async def _write(self, batch):
+        async with connect() as db:
+            existing_sql = text("SELECT user_id, post_id FROM views WHERE post_id IN :pids AND user_id IN :uids")
+            existing_sql = existing_sql.bindparams(bindparam("pids", expanding=True),
+                                                   bindparam("uids", expanding=True))
+            rows = (await db.execute(existing_sql, {
+                "pids": sorted({pid for _, pid in batch}),
+                "uids": sorted({uid for uid, _ in batch}),
+            })).fetchall()
+            new_views = batch - {(r.user_id, r.post_id) for r in rows}
+            if not new_views:
+                return 0
+
+            new_views = await self._insert_views(db, sorted(new_views))
+            if not new_views:
+                return 0
+            increments = Counter(pid for _, pid in new_views)
+            await db.execute(text("UPDATE posts SET views_count = views_count + :n WHERE id = :pid"),
+                             [{"n": n, "pid": pid} for pid, n in sorted(increments.items())])
+            await db.commit()
+            return len(new_views)
+
+    async def _insert_views(self, db, pairs):
+        insert_sql = text("INSERT INTO views (user_id, post_id) VALUES (:uid, :pid)")
+        try:
+            await db.execute(insert_sql, [{"uid": uid, "pid": pid} for uid, pid in pairs])
+            return set(pairs)
+        except IntegrityError:
+            # 다른 워커가 같은 쌍을 먼저 넣은 경우 (uq_views_user_post) - 한 건씩 넣으며 중복은 건너뛴다.
+            await db.rollback()
+        inserted = set()
+        for uid, pid in pairs:
+            try:
+                await db.execute(insert_sql, {"uid": uid, "pid": pid})
+                inserted.add((uid, pid))
+            except IntegrityError:
+                pass
+        return inserted
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("조회수 flush 실패")
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+view_buffer = ViewBuffer(
+    flush_interval=float(os.getenv("VIEW_FLUSH_INTERVAL", "5")),
+    max_pending=int(os.getenv("VIEW_FLUSH_MAX_PENDING", "1000")),
+    seen_size=int(os.getenv("VIEW_SEEN_CACHE_SIZE", "100000")),
+)
@@ -0,0 +1,69 @@
+"""GET /posts, /posts/{id}, /posts/{id}/comments 를 다시 받을 때 보내는 바이트와 처리 시간 비교.
+압축 없는 전체 응답(identity), gzip 전체 응답, If-None-Match 재검증(304) 세 가지를 잰다.
+
+    python benchmarks/bench_conditional_get.py --posts 2000 --comments 50
+"""
+import argparse
+import os
+import tempfile
+
+from common import use_sqlite, create_schema, seed, measure, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=50, help="상세 게시글 하나에 달린 댓글 수")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    use_sqlite(os.path.join(tempfile.gettempdir(), "bench_conditional_get.db"))
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    from sqlalchemy import text
+    from fastapi.testclient import TestClient
+    from app.db import engine
+    from app.main import app
+    from app.services.responses import brotli
+
+    create_schema(engine)
+    seed(engine, posts=args.posts)
+    post_id = args.posts
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE posts SET contents = :c WHERE id = :pid"),
+                     {"c": "오늘은 FastAPI 로 커뮤니티 백엔드를 만들면서 배운 점을 정리해 본다. " * 40, "pid": post_id})
+        conn.execute(text("INSERT INTO comments (post_id, user_id, content) VALUES (:pid, 1, :c)"),
+                     [{"pid": post_id, "c": f"좋은 글 감사합니다! 저도 비슷한 문제를 겪었는데 도움이 됐어요 {i}"}
+                      for i in range(args.comments)])
+        conn.execute(text("UPDATE posts SET comments_count = :n WHERE id = :pid"), {"n": args.comments, "pid": post_id})
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    endpoints = {
+        "GET /posts": ("/posts", {"limit": args.limit}),
+        "GET /posts/{post_id}": (f"/posts/{post_id}", {}),
+        "GET /posts/{post_id}/comments": (f"/posts/{post_id}/comments", {}),
+    }
+    with TestClient(app) as client:
+        for name, (url, params) in endpoints.items():
+            print(name)
+            etag = None
+            for encoding in encodings + ["304 revalidate"]:
+                headers = {"Accept-Encoding": "gzip" if encoding == "304 revalidate" else encoding}
+                if encoding == "304 revalidate":
+                    headers["If-None-Match"] = etag
+
+                def fetch():
+                    # 압축된 본문 크기를 보려고 자동 해제 없이 원시 바이트를 읽는다.
+                    with client.stream("GET", url, params=params, headers=headers) as r:
+                        return r, sum(len(chunk) for chunk in r.iter_raw())
+
+                response, sent = fetch()
+                etag = etag or response.headers["etag"]
+                samples = measure(fetch, args.repeat)
+                print(f"  {encoding:<15} status={response.status_code} bytes={sent:6d}  "
+                      f"p50={percentile(samples, 50):6.2f}ms  p99={percentile(samples, 99):6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""GET /users/email 의 "사용 가능" 판정: 매번 SELECT 하던 방식(before)과 Bloom filter 로 먼저 거르는 방식(after) 비교.
+사용자 --users 명을 넣고, 가입되지 않은 이메일 --checks 개로 오탐률과 호출당 시간을 잰다.
+
+    python benchmarks/bench_email_filter.py --users 100000 --checks 20000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from common import use_sqlite, create_schema, seed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--checks", type=int, default=20_000)
+    args = parser.parse_args()
+
+    use_sqlite(os.path.join(tempfile.gettempdir(), "bench_email_filter.db"))
+
+    from sqlalchemy import text
+    from app.db import connect, engine
+    from app.services import controllers
+    from app.services.email_filter import email_filter
+
+    create_schema(engine)
+    seed(engine, users=args.users, posts=0)
+    absent = [f"nobody{i}@example.com" for i in range(args.checks)]
+
+    async def before():
+        async with connect() as db:
+            for email in absent:
+                await db.execute(text("SELECT id FROM users WHERE email = :email"), {"email": email})
+
+    async def after():
+        async with connect() as db:
+            for email in absent:
+                await controllers._email_exists(email, db)
+
+    async def run():
+        started = time.perf_counter()
+        await email_filter.load()
+        load_ms = (time.perf_counter() - started) * 1000
+        results = {}
+        for name, fn in (("before (SELECT every check)", before), ("after (bloom filter first)", after)):
+            started = time.perf_counter()
+            await fn()
+            results[name] = (time.perf_counter() - started) / args.checks * 1e6
+        return load_ms, results
+
+    load_ms, results = asyncio.run(run())
+    stats = email_filter.stats()
+    print(f"load {stats['emails']} emails in {load_ms:.0f}ms, {stats['memory_bytes'] / 1024:.0f} KiB, "
+          f"k={stats['hashes']}, expected fp={stats['expected_fp_rate']:.4%}")
+    for name, us in results.items():
+        print(f"{name:<30} {us:8.1f} us/check")
+    print(f"observed fp={stats['observed_fp_rate']:.4%} ({stats['false_positives']} of {args.checks} went to the DB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""한 게시글에 대해 여러 사용자가 동시에 좋아요를 토글할 때 처리량과 카운터 정확성을 확인한다.
+
+    python benchmarks/bench_like_toggle.py --users 200 --toggles 5 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import use_sqlite, create_schema, create_session, seed
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import text
+    from app.db import engine
+    from app.main import app
+
+    create_schema(engine)
+    seed(engine, users=args.users, posts=1)
+    sessions = {}
+    with engine.begin() as conn:
+        for uid in range(1, args.users + 1):
+            sessions[uid] = create_session(conn, uid)
+
+    # 사용자마다 toggles 번씩, 순서를 섞어서 동시에 보낸다.
+    jobs = [uid for uid in sessions for _ in range(args.toggles)]
+    random.Random(7).shuffle(jobs)
+    statuses = {}
+    sem = asyncio.Semaphore(args.concurrency)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def toggle(uid):
+            async with sem:
+                r = await client.post("/posts/1/like", cookies={"session_id": sessions[uid]})
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(toggle(uid) for uid in jobs))
+        elapsed = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        counter = conn.execute(text("SELECT likes_count FROM posts WHERE id = 1")).scalar()
+        actual = conn.execute(text("SELECT COUNT(*) FROM likes WHERE post_id = 1")).scalar()
+
+    print(f"{len(jobs)} toggles in {elapsed:.2f}s -> {len(jobs) / elapsed:.1f} toggles/s  statuses={statuses}")
+    print(f"likes_count={counter} COUNT(likes)={actual} -> {'exact' if counter == actual else 'DRIFT'}")
+    return counter == actual
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--toggles", type=int, default=5, help="사용자당 토글 횟수")
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    use_sqlite(os.path.join(tempfile.gettempdir(), "bench_like_toggle.db"))
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
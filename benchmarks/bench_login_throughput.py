@@ -0,0 +1,75 @@
+"""POST /users/login 처리량을 bcrypt 프로세스 풀 워커 수(0/1/2/4/8)별로 측정.
+workers=0 은 프로세스 풀 없이 이벤트 루프의 기본 스레드풀에서 bcrypt 를 돌리는 기준선이다.
+
+    python benchmarks/bench_login_throughput.py --requests 200 --concurrency 32 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import use_sqlite, create_schema
+
+
+async def run_once(args):
+    import httpx
+    import bcrypt
+    from sqlalchemy import text
+    from app.db import engine
+    from app.main import app
+    from app.services.passwords import password_hasher
+
+    create_schema(engine)
+    hashed = bcrypt.hashpw(b"password", bcrypt.gensalt(args.rounds)).decode()
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (nickname, email, image_url, password) VALUES ('u', 'u@x.com', '', :p)"),
+                     {"p": hashed})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        sem = asyncio.Semaphore(args.concurrency)
+        statuses = {}
+
+        async def login():
+            async with sem:
+                r = await client.post("/users/login", json={"email": "u@x.com", "password": "password"})
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        await asyncio.gather(*(login() for _ in range(args.workers * 2)))  # 프로세스 풀 워밍업
+        statuses.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - start
+    password_hasher.shutdown()
+    label = "(thread pool, baseline)" if args.workers == 0 else "(process pool)"
+    print(f"workers={args.workers:<2} {label:<23} {args.requests / elapsed:8.1f} logins/s  statuses={statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None, help="지정하면 해당 워커 수로 한 번만 실행")
+    args = parser.parse_args()
+
+    if args.workers is None:
+        # 워커 수는 모듈 import 시점에 정해지므로 설정별로 별도 프로세스에서 실행한다.
+        for workers in (0, 1, 2, 4, 8):
+            subprocess.run([sys.executable, __file__, "--workers", str(workers),
+                            "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                            "--rounds", str(args.rounds)], check=True)
+        return
+
+    use_sqlite(os.path.join(tempfile.gettempdir(), f"bench_login_{args.workers}.db"))
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_QUEUE_SIZE"] = str(max(args.concurrency, 1))
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")  # 한 클라이언트에서 몰아서 보내므로 요청 제한은 끈다
+    asyncio.run(run_once(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""GET /posts 의 OFFSET 페이지네이션과 cursor(keyset) 페이지네이션 지연시간 비교.
+
+    python benchmarks/bench_pagination.py --posts 20000 --page 1000
+"""
+import argparse
+import os
+import tempfile
+
+from common import use_sqlite, create_schema, seed, measure, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    use_sqlite(os.path.join(tempfile.gettempdir(), "bench_pagination.db"))
+    os.environ["POSTS_CACHE_SIZE"] = "0"  # 응답 캐시 없이 쿼리 비용만 측정
+
+    from sqlalchemy import text
+    from fastapi.testclient import TestClient
+    from app.db import engine
+    from app.main import app
+    from app.services.controllers import encode_cursor
+
+    create_schema(engine)
+    seed(engine, posts=args.posts)
+    client = TestClient(app)
+
+    deep_offset = (args.page - 1) * args.limit
+    with engine.connect() as conn:
+        last_seen = conn.execute(text("SELECT id FROM posts ORDER BY id DESC LIMIT 1 OFFSET :o"),
+                                 {"o": deep_offset - 1}).scalar()
+
+    cases = {
+        "offset page 1": {"offset": 0, "limit": args.limit},
+        f"offset page {args.page}": {"offset": deep_offset, "limit": args.limit},
+        "cursor page 1": {"limit": args.limit},
+        f"cursor page {args.page}": {"cursor": encode_cursor(last_seen), "limit": args.limit},
+    }
+    for name, params in cases.items():
+        samples = measure(lambda: client.get("/posts", params=params).raise_for_status(), args.repeat)
+        print(f"{name:<22} p50={percentile(samples, 50):7.2f}ms  p99={percentile(samples, 99):7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
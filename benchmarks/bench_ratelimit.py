@@ -0,0 +1,36 @@
+"""RateLimiter.acquire() 한 번의 비용: 같은 키 반복(hot), 매번 새 키(버킷 표가 가득 차서 계속 밀어냄) 두 경우.
+
+    python benchmarks/bench_ratelimit.py --calls 1000000 --keys 100000
+"""
+import argparse
+import time
+
+import common  # noqa: F401  (저장소 루트를 sys.path 에 추가)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--keys", type=int, default=100_000, help="버킷 표 최대 크기")
+    args = parser.parse_args()
+
+    from app.services.ratelimit import RateLimiter
+
+    cases = {
+        "hot key": lambda i: "10.0.0.1",
+        "new key each call (evicting)": lambda i: f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}-{i}",
+    }
+    for name, key in cases.items():
+        limiter = RateLimiter(f"bench_{len(name)}", "100/second", maxsize=args.keys)
+        keys = [key(i) for i in range(args.calls)]
+        started = time.perf_counter()
+        for k in keys:
+            limiter.acquire(k)
+        elapsed = time.perf_counter() - started
+        stats = limiter.stats()
+        print(f"{name:<30} {elapsed / args.calls * 1e9:7.0f} ns/call  size={stats['size']} "
+              f"allowed={stats['allowed']} rejected={stats['rejected']} evictions={stats['evictions']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""검색 색인 크기와 질의 지연시간. 임의 생성한 한글/영문 글 --posts 개로 SearchIndex 를 메모리에서 만든다
+(DB 스트리밍 없이 색인 자체의 비용만 잰다). --like 를 주면 같은 글을 SQLite 에 넣고 LIKE '%q%' 와 비교한다.
+
+    python benchmarks/bench_search.py --posts 100000
+    python benchmarks/bench_search.py --posts 1000000 --words 20
+    python benchmarks/bench_search.py --posts 100000 --like
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import tempfile
+import time
+
+from common import measure, percentile, use_sqlite
+
+SYLLABLES = "가나다라마바사아자차카타파하고노도로모보소오조초코토포호구누두루무부수우주추쿠투푸후기니디리미비시이지치" \
+            "키티피히개내대래매배새애재채캐태패해강남당랑망방상앙장창캉탕팡항국눅둑룩묵북숙욱죽축한산안잔단란만반"
+ENGLISH = ["python", "fastapi", "mysql", "seoul", "busan", "travel", "coffee", "review", "study", "game",
+           "music", "movie", "design", "server", "cache", "index", "search", "query", "backend", "frontend"]
+
+
+def vocabulary(rnd, size):
+    words = set(ENGLISH)
+    while len(words) < size:
+        words.add("".join(rnd.choice(SYLLABLES) for _ in range(rnd.choice((2, 2, 3, 3, 4)))))
+    return sorted(words)
+
+
+def corpus(rnd, vocab, posts, words):
+    # 자주 쓰는 단어가 훨씬 많이 나오도록 Zipf 비슷한 가중치를 준다.
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocab))))
+    for post_id in range(1, posts + 1):
+        title = " ".join(rnd.choices(vocab, cum_weights=cumulative, k=3))
+        content = " ".join(rnd.choices(vocab, cum_weights=cumulative, k=words))
+        yield post_id, title, content
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=30, help="본문 단어 수")
+    parser.add_argument("--vocab", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--like", action="store_true", help="SQLite LIKE 스캔과 비교")
+    args = parser.parse_args()
+
+    use_sqlite(os.path.join(tempfile.gettempdir(), "bench_search.db"))
+
+    from starlette.concurrency import run_in_threadpool
+    from app.services.search import PostSearch, SearchIndex, rank_postings
+
+    rnd = random.Random(42)
+    vocab = vocabulary(rnd, args.vocab)
+    index = SearchIndex()
+    started = time.perf_counter()
+    for post_id, title, content in corpus(random.Random(7), vocab, args.posts, args.words):
+        index.add(post_id, title, content)
+    build = time.perf_counter() - started
+    memory = index.memory_bytes()
+    postings = index.postings()
+    print(f"{args.posts} posts: build {build:.1f}s ({args.posts / build:.0f} posts/s), "
+          f"{len(index.title) + len(index.content)} grams, {postings} postings, "
+          f"{memory / 2**20:.1f} MiB ({memory / args.posts:.0f} B/post, postings {postings * 4 / 2**20:.1f} MiB)")
+
+    queries = {
+        "common word": vocab[0],
+        "rare word": vocab[-1],
+        "two words": f"{vocab[3]} {vocab[50]}",
+        "english": "fastapi",
+        "no match": "없는검색어",
+    }
+    # 첫 페이지: 캐시 없이 매번 새로 찾는다 (색인이 바뀐 직후와 같음, 최고 점수 글로 채워지면 전체 순위를 만들지 않음).
+    # 전체 순위: 첫 페이지를 최고 점수 글로 못 채울 때 드는 비용. 다음 페이지: 캐시한 순위에서 잘라 온다.
+    search = PostSearch(refresh_interval=0, rebuild_interval=0, cache_size=64, cache_ttl=3600)
+    search.index = index
+    loop = asyncio.new_event_loop()
+    for name, q in queries.items():
+        page, _ = index.search(q, 10)
+        first = measure(lambda: index.search(q, 10), args.repeat)
+        full = measure(lambda: index.rank(q), max(5, args.repeat // 20))
+        print(f"  {name:<12} {q!r:<20} hits={len(index.rank(q)):<7} first page p50={percentile(first, 50):8.3f}ms "
+              f"p99={percentile(first, 99):8.3f}ms  full rank p50={percentile(full, 50):8.3f}ms", end="")
+        if page:
+            loop.run_until_complete(search.search(q, 10))
+            after = page[-1]
+            following = measure(lambda: loop.run_until_complete(search.search(q, 10, after)), args.repeat)
+            print(f"  next page p50={percentile(following, 50):6.3f}ms p99={percentile(following, 99):6.3f}ms", end="")
+        print()
+    loop.close()
+
+    # 전체 순위를 스레드풀로 넘기기 전에 루프에서 검색어의 목록을 복사하는 비용.
+    copied = measure(lambda: index.snapshot(queries["common word"]), max(5, args.repeat // 20))
+    print(f"  postings snapshot for {queries['common word']!r}: p50={percentile(copied, 50):.3f}ms")
+
+    # 전체 순위를 만드는 동안 이벤트 루프가 얼마나 늦게 깨어나는지 (1ms 주기 타이머의 최대 지연).
+    async def loop_lag(run):
+        lags = []
+
+        async def ticker():
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(0.001)
+                lags.append((time.perf_counter() - started) * 1000 - 1)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0.01)
+        for _ in range(5):
+            await run(queries["common word"])
+            await asyncio.sleep(0.005)  # 멈춰 있던 타이머가 지연을 기록할 틈
+        task.cancel()
+        return max(lags)
+
+    async def inline(q):
+        index.rank(q)
+
+    async def threaded(q):
+        await run_in_threadpool(rank_postings, index.snapshot(q))
+
+    print(f"  event loop max lag while ranking {queries['common word']!r}: "
+          f"inline {asyncio.run(loop_lag(inline)):.1f}ms, threadpool {asyncio.run(loop_lag(threaded)):.1f}ms")
+
+    if args.like:
+        from sqlalchemy import text
+        from app.db import engine
+        from common import create_schema
+        create_schema(engine)
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO posts (id, user_id, title, image_url, contents) VALUES (:id, 1, :t, '', :c)"),
+                         [{"id": i, "t": t, "c": c} for i, t, c in corpus(random.Random(7), vocab, args.posts,
+                                                                            args.words)])
+        sql = text("SELECT id FROM posts WHERE deleted_at IS NULL AND (title LIKE :q OR contents LIKE :q) "
+                   "ORDER BY id DESC LIMIT 10")
+        with engine.connect() as conn:
+            for name, q in queries.items():
+                samples = measure(lambda: conn.execute(sql, {"q": f"%{q}%"}).fetchall(), max(5, args.repeat // 20))
+                print(f"  LIKE {name:<7} {q!r:<20} p50={percentile(samples, 50):8.3f}ms "
+                      f"p99={percentile(samples, 99):8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
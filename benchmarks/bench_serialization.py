@@ -0,0 +1,78 @@
+"""게시글 목록 1,000건을 응답 bytes 로 만드는 시간: 행마다 dict 를 손으로 만들고 jsonable_encoder + json 으로
+직렬화하던 방식(before)과 컬럼 별칭 -> _asdict() + FastJSONResponse 직렬화(after) 비교.
+
+    python benchmarks/bench_serialization.py --rows 1000 --repeat 200
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from common import use_sqlite, create_schema, seed, measure, percentile
+
+BEFORE_SQL = """
+             SELECT p.id, p.title, p.likes_count, p.views_count, p.comments_count, p.created_at, p.image_url,
+                    u.nickname as author_nickname, u.image_url as author_profile_image
+             FROM posts p JOIN users u ON p.user_id = u.id
+             WHERE p.deleted_at IS NULL ORDER BY p.id DESC LIMIT :limit
+             """
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    use_sqlite(os.path.join(tempfile.gettempdir(), "bench_serialization.db"))
+
+    from fastapi.encoders import jsonable_encoder
+    from sqlalchemy import text
+    from app.db import engine
+    from app.services import controllers, serialization
+    from app.services.images import thumbnail_url
+
+    create_schema(engine)
+    seed(engine, posts=args.rows)
+    with engine.connect() as conn:
+        before_rows = conn.execute(text(BEFORE_SQL), {"limit": args.rows}).fetchall()
+        after_rows = conn.execute(text(controllers.POSTS_LIST_SQL + " WHERE p.deleted_at IS NULL"
+                                       " ORDER BY p.id DESC LIMIT :limit"), {"limit": args.rows}).fetchall()
+
+    def before():
+        results = []
+        for p in before_rows:
+            results.append({
+                "post_id": p.id,
+                "title": p.title,
+                "likes": p.likes_count,
+                "comments": p.comments_count,
+                "views": p.views_count,
+                "created_at": str(p.created_at),
+                "image_thumbnail": thumbnail_url(p.image_url),
+                "author_nickname": p.author_nickname,
+                "author_profile_image": thumbnail_url(p.author_profile_image)
+            })
+        # FastAPI 기본 경로: jsonable_encoder -> JSONResponse(json.dumps)
+        payload = jsonable_encoder({"posts": results, "next_cursor": None})
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def after():
+        results = []
+        for p in after_rows:
+            item = p._asdict()
+            item["image_thumbnail"] = thumbnail_url(p.image_thumbnail)
+            item["author_profile_image"] = thumbnail_url(p.author_profile_image)
+            results.append(item)
+        return serialization.dumps({"posts": results, "next_cursor": None})
+
+    assert json.loads(before()) == json.loads(after()), "두 경로의 응답 내용이 다릅니다"
+    backend = "orjson" if serialization.orjson is not None else "stdlib json"
+    for name, fn in (("before (dict + jsonable_encoder + json)", before), (f"after ({backend})", after)):
+        samples = measure(fn, args.repeat)
+        print(f"{name:<42} {args.rows} rows  p50={percentile(samples, 50):7.3f}ms  "
+              f"p99={percentile(samples, 99):7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""요청당 SQL 실행 횟수가 예산을 넘지 않는지 확인한다 (넘으면 exit 1).
+
+    python benchmarks/check_query_budget.py
+"""
+import os
+import sys
+import tempfile
+
+from common import use_sqlite, create_schema, seed
+
+# (설명, method, path, 로그인 여부, 허용 쿼리 수)
+BUDGETS = [
+    ("post detail (anonymous)", "GET", "/posts/1", False, 1),
+    ("post detail (logged in)", "GET", "/posts/1", True, 1),
+    ("post detail (missing)", "GET", "/posts/999999", True, 1),
+    # 방금 쓴 글(인기 순위에 아직 없음)을 처음 조회: 순위에 들어가면서 요약 조회 쿼리가 더 나가면 안 된다.
+    ("post detail (untracked post)", "GET", "/posts/{new_post}", True, 1),
+]
+
+
+def main():
+    use_sqlite(os.path.join(tempfile.gettempdir(), "check_query_budget.db"))
+    os.environ["QUERY_COUNT_HEADER"] = "true"
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")  # 한 클라이언트에서 몰아서 보내므로 요청 제한은 끈다
+
+    from fastapi.testclient import TestClient
+    from app.db import engine
+    from app.main import app
+
+    create_schema(engine)
+    seed(engine, users=10, posts=100, comments=200, likes=50)
+
+    failed = False
+    with TestClient(app) as client:
+        client.post("/users/signup", data={"email": "budget@example.com", "password": "pw", "nickname": "budget"})
+        client.post("/users/login", json={"email": "budget@example.com", "password": "pw"})
+        client.get("/users/me")  # 세션 캐시 워밍업
+        session_cookie = client.cookies.get("session_id")
+        client.post("/api/posts", data={"title": "budget", "content": "budget"})
+        new_post = client.get("/posts", params={"limit": 1}).json()["posts"][0]["post_id"]
+
+        for name, method, path, logged_in, budget in BUDGETS:
+            client.cookies.clear()
+            if logged_in:
+                client.cookies.set("session_id", session_cookie)
+            response = client.request(method, path.format(new_post=new_post))
+            used = int(response.headers["X-Query-Count"])
+            status = "ok" if used <= budget else "OVER BUDGET"
+            failed = failed or used > budget
+            print(f"{name:<28} {response.status_code} queries={used} budget={budget} {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""replica 를 쓸 때 글을 쓴 클라이언트가 바로 다음 목록 조회에서 자기 글을 보는지 확인한다 (못 보면 exit 1).
+
+primary 를 복사한 파일을 "복제가 멈춘" replica 로 두고, 다른 클라이언트가 replica 에서 목록 캐시를 다시 채운 뒤에도
+쓴 클라이언트(db_primary_until 쿠키)가 새 글을 보는지 본다.
+
+    python benchmarks/check_read_your_writes.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+from common import use_sqlite, create_schema, seed
+
+
+def main():
+    primary = os.path.join(tempfile.gettempdir(), "check_ryw_primary.db")
+    replica = os.path.join(tempfile.gettempdir(), "check_ryw_replica.db")
+    use_sqlite(primary)
+    os.environ["DB_REPLICA_URLS"] = f"sqlite:///{replica}"
+    os.environ["DB_REPLICA_CHECK_INTERVAL"] = "0"
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    from fastapi.testclient import TestClient
+    from app.db import engine
+    from app.main import app
+
+    create_schema(engine)
+    seed(engine, users=10, posts=10)
+
+    failed = False
+    reader = TestClient(app)  # 쿠키만 따로 쓰는 두 번째 클라이언트 (lifespan 은 writer 쪽에서 한 번만 돌린다)
+    with TestClient(app) as writer:
+        writer.post("/users/signup", data={"email": "ryw@example.com", "password": "pw", "nickname": "ryw"})
+        writer.post("/users/login", json={"email": "ryw@example.com", "password": "pw"})
+        # 여기서부터 replica 는 갱신되지 않는다.
+        shutil.copyfile(primary, replica)
+
+        def newest(client):
+            return client.get("/posts", params={"limit": 1}).json()["posts"][0]["post_id"]
+
+        reader.get("/posts", params={"limit": 1})  # replica 에서 캐시 채움
+        created = writer.post("/api/posts", data={"title": "ryw", "content": "ryw"})
+        reader.get("/posts", params={"limit": 1})  # 무효화 직후 replica 에서 다시 채움
+        checks = [
+            ("write succeeded", created.status_code, 201),
+            ("writer sees own post", newest(writer), 11),
+            ("other reader uses stale replica", newest(reader), 10),
+        ]
+        writer.cookies.delete("db_primary_until")
+        checks.append(("writer after sticky window", newest(writer), 10))
+
+    for name, got, expected in checks:
+        ok = got == expected
+        failed = failed or not ok
+        print(f"{name:<34} got={got} expected={expected} {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
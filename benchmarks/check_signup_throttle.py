@@ -0,0 +1,75 @@
+"""이메일별 가입 제한에 걸린 요청이 프로필 이미지를 받거나 저장하지 않는지 확인한다 (건드리면 exit 1).
+
+같은 이메일로 제한(1/hour)을 넘겨 다시 가입하면서 큰 이미지를 붙인다. 429 가 나와야 하고, 이미지 디렉터리에 파일이
+생기거나 Starlette 가 업로드 파트를 임시 파일(SpooledTemporaryFile)로 받기 시작해서는 안 된다.
+
+    python benchmarks/check_signup_throttle.py
+"""
+import os
+import sys
+import tempfile
+
+from common import use_sqlite, create_schema, seed
+from run import tiny_png
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="check_signup_throttle_")
+    os.chdir(workdir)  # 업로드가 저장소의 static/images 를 더럽히지 않도록
+    use_sqlite(os.path.join(workdir, "check.db"))
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.environ["RATE_LIMIT_ENABLED"] = "true"
+    os.environ["RATE_LIMIT_SIGNUP_EMAIL"] = "1/hour"
+
+    import starlette.formparsers
+    from fastapi.testclient import TestClient
+    from app.db import engine
+    from app.main import app
+    from app.services import images
+
+    create_schema(engine)
+    seed(engine, users=10, posts=10)
+
+    spooled = []
+    spool_class = starlette.formparsers.SpooledTemporaryFile
+
+    def counting_spool(*args, **kwargs):
+        spooled.append(1)
+        return spool_class(*args, **kwargs)
+
+    starlette.formparsers.SpooledTemporaryFile = counting_spool
+
+    def stored():
+        return sum(len(files) for _, _, files in os.walk(images.IMAGE_DIR))
+
+    # 크기 제한 안쪽이지만 스풀 한도(1MB)는 넘는 이미지: 받기 시작했다면 디스크 임시 파일까지 간다.
+    large_image = tiny_png() + b"\0" * (2 * 1024 * 1024)
+    form = {"email": "throttle@example.com", "password": "pw", "nickname": "throttle"}
+
+    with TestClient(app) as client:
+        first = client.post("/users/signup", data=form, files={"profile_image": ("a.png", tiny_png(), "image/png")})
+        stored_before, spooled_before = stored(), len(spooled)
+        throttled = client.post("/users/signup", data={**form, "email": " Throttle@Example.com"},
+                                files={"profile_image": ("b.png", large_image, "image/png")})
+        checks = [
+            ("first signup", first.status_code, 201),
+            ("first signup stored image", stored_before > 0, True),
+            ("throttled signup", throttled.status_code, 429),
+            ("throttled signup Retry-After", "retry-after" in throttled.headers, True),
+            ("files stored while throttled", stored() - stored_before, 0),
+            ("uploads spooled while throttled", len(spooled) - spooled_before, 0),
+            # 이미지 없는 urlencoded 가입도 같은 이메일 제한을 받는다.
+            ("throttled urlencoded signup", client.post("/users/signup", data=form).status_code, 429),
+        ]
+
+    failed = False
+    for name, got, expected in checks:
+        ok = got == expected
+        failed = failed or not ok
+        print(f"{name:<34} got={got} expected={expected} {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
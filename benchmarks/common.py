@@ -0,0 +1,88 @@
+"""벤치마크 공용 유틸: 로컬 SQLite DB 준비/시딩과 지연시간 통계."""
+import os
+import sys
+import time
+import random
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def use_sqlite(db_path):
+    # app.db 가 import 되기 전에 호출해야 엔진이 SQLite 로 만들어진다.
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+
+def create_schema(engine):
+    from app.db import Base
+    import app.models.model  # noqa: F401  (테이블 등록)
+    Base.metadata.create_all(engine)
+
+
+def seed(engine, users=100, posts=1000, comments=0, likes=0, batch=5000):
+    from sqlalchemy import text
+
+    rnd = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO users (id, nickname, email, image_url, password) VALUES (:id, :n, :e, '', 'x')"),
+            [{"id": i, "n": f"user{i}", "e": f"user{i}@example.com"} for i in range(1, users + 1)],
+        )
+        _bulk(conn, text("""INSERT INTO posts (id, user_id, title, image_url, contents,
+                                               views_count, likes_count, comments_count)
+                            VALUES (:id, :uid, :t, '', :c, 0, 0, 0)"""),
+              ({"id": i, "uid": rnd.randint(1, users), "t": f"post {i}", "c": f"contents of post {i}"}
+               for i in range(1, posts + 1)), batch)
+        _bulk(conn, text("INSERT INTO comments (post_id, user_id, content) VALUES (:pid, :uid, :c)"),
+              ({"pid": rnd.randint(1, posts), "uid": rnd.randint(1, users), "c": f"comment {i}"}
+               for i in range(comments)), batch)
+        pairs = set()
+        while len(pairs) < min(likes, users * posts):
+            pairs.add((rnd.randint(1, users), rnd.randint(1, posts)))
+        _bulk(conn, text("INSERT INTO likes (user_id, post_id) VALUES (:uid, :pid)"),
+              ({"uid": u, "pid": p} for u, p in pairs), batch)
+        conn.execute(text("""UPDATE posts SET
+                                 likes_count = (SELECT COUNT(*) FROM likes l WHERE l.post_id = posts.id),
+                                 comments_count = (SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.id)"""))
+
+
+def create_session(conn, user_id):
+    # 만료가 충분히 먼 세션을 직접 만든다 (로그인 bcrypt 비용 없이 인증 요청을 보내기 위해).
+    from sqlalchemy import text
+
+    session_id = str(uuid.uuid4())
+    conn.execute(text("INSERT INTO sessions (session_id, expires, data, user_id) VALUES (:s, :e, :d, :u)"),
+                 {"s": session_id, "e": int(time.time()) + 30 * 24 * 3600, "d": str(user_id), "u": user_id})
+    return session_id
+
+
+def _bulk(conn, sql, rows, batch):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch:
+            conn.execute(sql, chunk)
+            chunk = []
+    if chunk:
+        conn.execute(sql, chunk)
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
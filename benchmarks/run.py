@@ -0,0 +1,414 @@
+"""routes.py 의 모든 엔드포인트를 ASGI 앱에 직접(in-process) 요청해 처리량/지연시간/쿼리 수를 JSON 으로 남긴다.
+
+시드한 로컬 SQLite 를 쓰며, 같은 인자로 돌리면 같은 데이터/같은 요청 순서가 나온다.
+
+    python benchmarks/run.py --posts 5000 --concurrency 1,8,32 --out before.json
+    python benchmarks/run.py --only "GET /posts" --out after.json
+    python benchmarks/run.py --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import struct
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+
+from common import use_sqlite, create_schema, create_session, seed, percentile
+
+BENCH_PASSWORD = "bench-password"
+MAIN_USER = 1  # 조회/작성/수정 시나리오에 쓰는 사용자
+PASSWORD_USER = 2  # 비밀번호 변경 시나리오 전용 (로그인 시나리오와 섞이지 않게)
+
+
+def tiny_png():
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(b"\x00\xff\x00\x00")) + chunk(b"IEND", b""))
+
+
+class Fixtures:
+    """시드 데이터 위에 시나리오가 소비할 세션/글/댓글/사용자를 미리 만든다 (측정 구간 밖)."""
+
+    def __init__(self, engine, args):
+        from sqlalchemy import text
+
+        self.engine = engine
+        self.text = text
+        self.args = args
+        self.rnd = random.Random(args.seed)
+        self.sessions = {MAIN_USER: self.session_for(MAIN_USER), PASSWORD_USER: self.session_for(PASSWORD_USER)}
+        self.main_posts = self.posts_for(MAIN_USER, 20)
+        self.main_comments = self.comments_for(MAIN_USER, 20)
+
+    def execute(self, sql, params=None):
+        with self.engine.begin() as conn:
+            return conn.execute(self.text(sql), params)
+
+    def session_for(self, user_id):
+        with self.engine.begin() as conn:
+            return create_session(conn, user_id)
+
+    def sessions_for_new_users(self, n):
+        first = self.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM users").scalar()
+        user_ids = list(range(first, first + n))
+        self.execute("INSERT INTO users (id, nickname, email, image_url, password) VALUES (:id, :n, :e, '', 'x')",
+                     [{"id": uid, "n": f"tmp{uid}"[:10], "e": f"tmp{uid}@example.com"} for uid in user_ids])
+        return [self.session_for(uid) for uid in user_ids]
+
+    def posts_for(self, user_id, n):
+        first = self.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM posts").scalar()
+        self.execute("""INSERT INTO posts (id, user_id, title, image_url, contents, views_count, likes_count,
+                                           comments_count)
+                        VALUES (:id, :uid, 'bench', '', 'bench', 0, 0, 0)""",
+                     [{"id": first + i, "uid": user_id} for i in range(n)])
+        return list(range(first, first + n))
+
+    def comments_for(self, user_id, n):
+        first = self.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM comments").scalar()
+        self.execute("INSERT INTO comments (id, post_id, user_id, content) VALUES (:id, :pid, :uid, 'bench')",
+                     [{"id": first + i, "pid": self.post_id(), "uid": user_id} for i in range(n)])
+        return list(range(first, first + n))
+
+    def post_id(self):
+        return self.rnd.randint(1, self.args.posts)
+
+
+def scenarios(fx, image_url):
+    """(이름, 기대 상태 코드, n개의 요청을 만드는 함수). 이름은 routes.py 의 경로 템플릿을 따른다."""
+    main = {"session_id": fx.sessions[MAIN_USER]}
+
+    def each(n, build):
+        return [build(i) for i in range(n)]
+
+    def form(**fields):
+        return {k: (None, v) for k, v in fields.items()}
+
+    return [
+        ("POST /users/signup", 201, lambda n: each(n, lambda i: dict(
+            method="POST", url="/users/signup",
+            files=form(email=f"bench-{uuid.uuid4().hex}@example.com", password=BENCH_PASSWORD, nickname="bench"),
+        ))),
+        ("POST /users/login", 200, lambda n: each(n, lambda i: dict(
+            method="POST", url="/users/login", json={"email": "user1@example.com", "password": BENCH_PASSWORD},
+        ))),
+        ("POST /users/logout", 200, lambda n: [
+            dict(method="POST", url="/users/logout", cookies={"session_id": fx.session_for(MAIN_USER)})
+            for _ in range(n)
+        ]),
+        ("GET /users/me", 200, lambda n: each(n, lambda i: dict(method="GET", url="/users/me", cookies=main))),
+        ("GET /users/email", 200, lambda n: each(n, lambda i: dict(
+            method="GET", url="/users/email", params={"email": f"free-{i}@example.com"},
+        ))),
+        ("PATCH /users/{user_id}", 200, lambda n: each(n, lambda i: dict(
+            method="PATCH", url=f"/users/{MAIN_USER}", json={"nickname": f"nick{i % 1000}"}, cookies=main,
+        ))),
+        ("PUT /users/me/password", 200, lambda n: each(n, lambda i: dict(
+            method="PUT", url="/users/me/password", json={"password": BENCH_PASSWORD},
+            cookies={"session_id": fx.sessions[PASSWORD_USER]},
+        ))),
+        ("DELETE /users/me", 200, lambda n: [
+            dict(method="DELETE", url="/users/me", cookies={"session_id": s}) for s in fx.sessions_for_new_users(n)
+        ]),
+        ("GET /stats/session-cache", 200, lambda n: each(n, lambda i: dict(method="GET", url="/stats/session-cache"))),
+        ("GET /metrics", 200, lambda n: each(n, lambda i: dict(method="GET", url="/metrics"))),
+        ("GET /posts", 200, lambda n: each(n, lambda i: dict(
+            method="GET", url="/posts", params={"offset": fx.rnd.randrange(0, 200, 10), "limit": 10},
+        ))),
+        ("GET /posts/popular", 200, lambda n: each(n, lambda i: dict(
+            method="GET", url="/posts/popular", params={"limit": 10},
+        ))),
+        ("GET /posts/search", 200, lambda n: each(n, lambda i: dict(
+            method="GET", url="/posts/search", params={"q": "bench", "limit": 10},
+        ))),
+        ("POST /api/posts", 201, lambda n: each(n, lambda i: dict(
+            method="POST", url="/api/posts", files=form(title=f"bench {i}", content="bench"), cookies=main,
+        ))),
+        ("GET /posts/{post_id}", 200, lambda n: each(n, lambda i: dict(
+            method="GET", url=f"/posts/{fx.post_id()}", cookies=main,
+        ))),
+        ("PUT /api/posts/{post_id}", 200, lambda n: each(n, lambda i: dict(
+            method="PUT", url=f"/api/posts/{fx.rnd.choice(fx.main_posts)}",
+            files=form(title=f"edited {i}", content="edited"), cookies=main,
+        ))),
+        ("DELETE /posts/{post_id}", 200, lambda n: [
+            dict(method="DELETE", url=f"/posts/{pid}", cookies=main) for pid in fx.posts_for(MAIN_USER, n)
+        ]),
+        ("POST /posts/{post_id}/like", 200, lambda n: each(n, lambda i: dict(
+            method="POST", url=f"/posts/{fx.post_id()}/like", cookies=main,
+        ))),
+        ("GET /posts/{post_id}/comments", 200, lambda n: each(n, lambda i: dict(
+            method="GET", url=f"/posts/{fx.post_id()}/comments", cookies=main,
+        ))),
+        ("GET /posts/{post_id}/comments?stream", 200, lambda n: each(n, lambda i: dict(
+            method="GET", url=f"/posts/{fx.post_id()}/comments", params={"stream": "true"}, cookies=main,
+        ))),
+        ("GET /posts/{post_id}/events", 200, lambda n: each(n, lambda i: dict(
+            method="GET", url=f"/posts/{fx.post_id()}/events", sse=True,
+        ))),
+        ("POST /posts/{post_id}/comments", 200, lambda n: each(n, lambda i: dict(
+            method="POST", url=f"/posts/{fx.post_id()}/comments", json={"content": f"bench {i}"}, cookies=main,
+        ))),
+        ("PUT /comments/{comment_id}", 200, lambda n: each(n, lambda i: dict(
+            method="PUT", url=f"/comments/{fx.rnd.choice(fx.main_comments)}", json={"content": f"edited {i}"},
+            cookies=main,
+        ))),
+        ("DELETE /comments/{comment_id}", 200, lambda n: [
+            dict(method="DELETE", url=f"/comments/{cid}", cookies=main) for cid in fx.comments_for(MAIN_USER, n)
+        ]),
+        ("GET /static/images/{image_path}", 200, lambda n: each(n, lambda i: dict(method="GET", url=image_url))),
+    ]
+
+
+def pool_checkouts():
+    from app.db import engine, async_engine
+
+    checked_out = engine.pool.checkedout()
+    if async_engine is not None:
+        checked_out += async_engine.sync_engine.pool.checkedout()
+    return checked_out
+
+
+async def open_event_stream(app, url):
+    """SSE 응답을 ASGI 로 직접 열고 첫 이벤트(카운터 스냅샷)까지 받는다. (상태 코드, 응답 헤더, 연결을 끊는 함수).
+
+    SSE 는 끝나지 않는 응답이라 httpx 의 ASGITransport 로는 본문을 다 받을 때까지 기다리다 멈춘다.
+    """
+    path, _, query = url.partition("?")
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+             "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80)}
+    first_event = asyncio.get_running_loop().create_future()
+    disconnected = asyncio.Event()
+    start = {}
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body" and not first_event.done():
+            first_event.set_result(None)
+
+    task = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait([first_event, task], return_when=asyncio.FIRST_COMPLETED)
+    if not first_event.done():
+        task.result()  # 응답 없이 끝났으면 예외를 그대로 올린다
+
+    async def close():
+        disconnected.set()
+        await task
+
+    headers = {k.decode().lower(): v.decode() for k, v in start.get("headers", [])}
+    return start["status"], headers, close
+
+
+async def check_event_streams(app, client, fx, n):
+    """SSE 연결 n 개를 열어 둔 채로 DB 커넥션 풀 대여 수가 열기 전과 같은지 본다 (스트림이 커넥션을 잡고 있지 않은지).
+
+    열어 둔 동안 다른 라우트가 커넥션을 얻는지, 닫은 뒤 SSE 연결 수가 0 으로 돌아오는지도 같이 본다.
+    """
+    from app.services.events import post_events
+
+    baseline = pool_checkouts()
+    streams = await asyncio.gather(*(open_event_stream(app, f"/posts/{fx.post_id()}/events") for _ in range(n)))
+    held = pool_checkouts() - baseline
+    while_open = (await client.get(f"/posts/{fx.post_id()}")).status_code
+    await asyncio.gather(*(close() for _, _, close in streams))
+    return {
+        "streams_opened": sum(status == 200 for status, _, _ in streams),
+        "pool_checkouts_while_open": held,
+        "pool_checkouts_after_close": pool_checkouts() - baseline,
+        "open_streams_after_close": post_events.connections,
+        "status_while_open": while_open,
+    }
+
+
+async def run_scenario(app, client, requests, concurrency):
+    from app.services import metrics
+
+    latencies, statuses = [], {}
+    pending = iter(requests)
+
+    async def worker():
+        for request in pending:
+            cookies = request.pop("cookies", None)
+            if cookies:
+                # 요청마다 다른 세션을 쓰므로 클라이언트 쿠키 저장소 대신 헤더로 직접 보낸다.
+                request["headers"] = {"Cookie": "; ".join(f"{k}={v}" for k, v in cookies.items())}
+            start = time.perf_counter()
+            if request.pop("sse", False):
+                # 끝나지 않는 응답이므로 첫 이벤트까지의 시간을 재고 바로 끊는다.
+                status, _, close = await open_event_stream(app, request["url"])
+                await close()
+            else:
+                response = await client.request(**request)
+                status = response.status_code
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    # 쿼리 수는 X-Query-Count 헤더 대신 db_queries_per_request 히스토그램의 증가분으로 잰다.
+    # 헤더는 본문보다 먼저 나가서 스트리밍 응답 본문의 SQL 을 담지 못한다. 시나리오는 하나씩 돌므로 증가분이 곧 이 시나리오 몫이다.
+    observed_before, queries_before = metrics.db_queries_per_request.totals()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    observed, queries = (after - before for after, before in
+                         zip(metrics.db_queries_per_request.totals(), (observed_before, queries_before)))
+    return elapsed, latencies, statuses, round(queries / observed, 2) if observed else None
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import text
+    from app.db import engine
+    from app.main import app
+
+    create_schema(engine)
+    seed(engine, users=args.users, posts=args.posts, comments=args.comments, likes=args.likes)
+    from app.services.passwords import _hash
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE users SET password = :p WHERE id IN (:a, :b)"),
+                     {"p": _hash(BENCH_PASSWORD, int(os.environ["BCRYPT_ROUNDS"])), "a": MAIN_USER, "b": PASSWORD_USER})
+        conn.execute(text("ANALYZE"))
+    fx = Fixtures(engine, args)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            upload = await client.post("/api/posts", cookies={"session_id": fx.sessions[MAIN_USER]},
+                                       data={"title": "image", "content": "image"},
+                                       files={"image": ("bench.png", tiny_png(), "image/png")})
+            upload.raise_for_status()
+            image_url = (await client.get("/posts", params={"limit": 1})).json()["posts"][0]["image_thumbnail"]
+
+            for name, expected, build in scenarios(fx, image_url):
+                if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                    continue
+                for concurrency in args.concurrency:
+                    requests = build(args.requests)
+                    await run_scenario(app, client, build(min(args.warmup, args.requests)), concurrency)
+                    elapsed, latencies, statuses, queries_per_request = await run_scenario(app, client, requests, concurrency)
+                    ok = statuses.get(expected, 0)
+                    result = {
+                        "route": name,
+                        "concurrency": concurrency,
+                        "requests": len(requests),
+                        "errors": len(requests) - ok,
+                        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+                        "throughput_rps": round(len(requests) / elapsed, 1),
+                        "p50_ms": round(percentile(latencies, 50), 3),
+                        "p95_ms": round(percentile(latencies, 95), 3),
+                        "p99_ms": round(percentile(latencies, 99), 3),
+                        "queries_per_request": queries_per_request,
+                    }
+                    if name == "GET /posts/{post_id}/events":
+                        # 동시성만큼 스트림을 열어 둔 채로 풀 대여 수가 기준선으로 돌아와 있는지 확인한다.
+                        streams = await check_event_streams(app, client, fx, concurrency)
+                        result["streams"] = streams
+                        if (streams["streams_opened"] != concurrency or streams["pool_checkouts_while_open"]
+                                or streams["pool_checkouts_after_close"] or streams["open_streams_after_close"]
+                                or streams["status_while_open"] != 200):
+                            result["errors"] += 1
+                    results.append(result)
+                    print(f"{name:<38} c={concurrency:<3} {result['throughput_rps']:>8.1f} req/s  "
+                          f"p50={result['p50_ms']:7.2f}ms p99={result['p99_ms']:7.2f}ms  "
+                          f"q/req={result['queries_per_request']}  errors={result['errors']}"
+                          + (f"  streams={result['streams']}" if "streams" in result else ""), file=sys.stderr)
+    return results
+
+
+METRICS = [("throughput_rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False),
+           ("queries_per_request", False)]
+
+
+def compare(before_path, after_path):
+    with open(before_path, encoding="utf-8") as f:
+        before = {(r["route"], r["concurrency"]): r for r in json.load(f)["results"]}
+    with open(after_path, encoding="utf-8") as f:
+        after = {(r["route"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    print(f"{'route':<38} {'c':>3}  " + "  ".join(f"{name:>24}" for name, _ in METRICS))
+    for key in sorted(before.keys() & after.keys()):
+        cells = []
+        for name, higher_is_better in METRICS:
+            a, b = before[key][name], after[key][name]
+            if a is None or b is None:
+                cells.append(f"{'-':>24}")
+                continue
+            change = (b - a) / a * 100 if a else 0.0
+            better = change > 0 if higher_is_better else change < 0
+            mark = "+" if better and abs(change) >= 5 else ("!" if abs(change) >= 5 else " ")
+            cells.append(f"{a:>9g} -> {b:<9g}{change:+5.0f}%{mark}")
+        print(f"{key[0]:<38} {key[1]:>3}  " + "  ".join(cells))
+    for key in sorted(before.keys() ^ after.keys()):
+        print(f"{key[0]:<38} {key[1]:>3}  only in {'before' if key in before else 'after'}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--likes", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200, help="시나리오/동시성 조합마다 보낼 요청 수")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", default="1,8,32", help="쉼표로 구분한 동시 요청 수")
+    parser.add_argument("--only", action="append", help="이 접두어로 시작하는 시나리오만 (여러 번 지정 가능)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="결과 JSON 경로 (없으면 stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="두 결과 JSON 비교")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    out_path = os.path.abspath(args.out) if args.out else None
+
+    # 업로드 파일이 저장소를 더럽히지 않도록 임시 작업 디렉터리에서 앱을 띄운다.
+    workdir = tempfile.mkdtemp(prefix="bench_run_")
+    os.chdir(workdir)
+    use_sqlite(os.path.join(workdir, "bench.db"))
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")  # 해시 비용이 다른 라우트 결과를 가리지 않도록
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")  # 한 클라이언트에서 몰아서 보내므로 요청 제한은 끈다
+
+    started = time.time()
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "database": "sqlite",
+            "bcrypt_rounds": int(os.environ["BCRYPT_ROUNDS"]),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "results": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+-- 좋아요 토글은 (user_id, post_id) UNIQUE 제약에 기대어 중복을 막는다.
+-- 제약을 걸기 전에 기존 중복 행을 정리하고 likes_count 를 실제 개수로 맞춘다.
+DELETE FROM likes
+WHERE id NOT IN (SELECT id FROM (SELECT MIN(id) AS id FROM likes GROUP BY user_id, post_id) AS keep_rows);
+
+CREATE UNIQUE INDEX uq_likes_user_post ON likes (user_id, post_id);
+
+UPDATE posts SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id);
@@ -0,0 +1,23 @@
+-- 컨트롤러 쿼리의 WHERE / ORDER BY 에 맞춘 인덱스.
+-- users.email 에 중복이 남아 있으면 UNIQUE 생성이 실패하므로 아래 check 가 중복 목록을 출력하고 적용을 멈춘다.
+-- 정리 방법: 중복된 이메일마다 실제로 쓰는 계정 하나만 남기고, 나머지 계정의 email 을 바꾼다 (예: 'dup-<id>-' 접두사).
+--   UPDATE users SET email = CONCAT('dup-', id, '-', email)
+--   WHERE id NOT IN (SELECT id FROM (SELECT MIN(id) AS id FROM users GROUP BY email) AS keep_rows);
+-- (위 예시는 가장 먼저 가입한 계정을 남긴다. 계정을 합쳐야 하면 글/댓글/좋아요의 user_id 를 먼저 옮긴다.)
+-- 비교는 DB collation 기준이므로 대소문자만 다른 이메일도 중복으로 잡힌다.
+-- check: SELECT email, COUNT(*) AS accounts FROM users GROUP BY email HAVING COUNT(*) > 1
+
+-- 로그인 / 이메일 중복 체크: WHERE email = :email
+CREATE UNIQUE INDEX uq_users_email ON users (email);
+
+-- 게시글 목록: WHERE deleted_at IS NULL [AND id < :cursor] ORDER BY id DESC
+CREATE INDEX ix_posts_deleted_id ON posts (deleted_at, id);
+
+-- 댓글 목록: WHERE post_id = :pid AND deleted_at IS NULL AND id > :cursor ORDER BY id
+CREATE INDEX ix_comments_post_deleted_id ON comments (post_id, deleted_at, id);
+
+-- 조회 기록: (user_id, post_id) 중복 제거 후 UNIQUE
+DELETE FROM views
+WHERE id NOT IN (SELECT id FROM (SELECT MIN(id) AS id FROM views GROUP BY user_id, post_id) AS keep_rows);
+
+CREATE UNIQUE INDEX uq_views_user_post ON views (user_id, post_id);
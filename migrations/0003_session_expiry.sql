@@ -0,0 +1,11 @@
+-- 세션 만료: 로그인 시 expires 에 만료 시각(epoch 초)을 넣고, 스위퍼가 지난 세션을 조금씩 지운다.
+-- expires = 0 으로 만들어진 기존 세션은 만료된 것으로 취급된다 (한 번 다시 로그인 필요).
+
+-- 사용자별 세션 개수 제한 / 탈퇴 시 세션 삭제용
+ALTER TABLE sessions ADD COLUMN user_id INT NULL;
+
+-- 스위퍼: WHERE expires < :now LIMIT :batch
+CREATE INDEX ix_sessions_expires ON sessions (expires);
+
+-- 로그인 시 개수 제한: WHERE user_id = :uid ORDER BY expires DESC
+CREATE INDEX ix_sessions_user_expires ON sessions (user_id, expires);
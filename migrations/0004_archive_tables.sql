@@ -0,0 +1,63 @@
+-- 보관 기간이 지난 soft delete 게시글/댓글(과 딸린 좋아요/조회 기록)을 옮겨 둘 보관 테이블.
+-- 행을 옮기는 작업은 scripts/archive_deleted.py 가 한다.
+
+CREATE TABLE posts_archive (
+    id             INTEGER      NOT NULL,
+    user_id        INTEGER      NOT NULL,
+    title          VARCHAR(26)  NOT NULL,
+    image_url      VARCHAR(255) NOT NULL,
+    contents       TEXT,
+    views_count    INTEGER DEFAULT '0',
+    likes_count    INTEGER DEFAULT '0',
+    comments_count INTEGER DEFAULT '0',
+    created_at     TIMESTAMP    NULL,
+    updated_at     TIMESTAMP    NULL,
+    deleted_at     TIMESTAMP    NULL,
+    archived_at    TIMESTAMP    NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE comments_archive (
+    id          INTEGER      NOT NULL,
+    post_id     INTEGER      NOT NULL,
+    user_id     INTEGER      NOT NULL,
+    content     VARCHAR(300) NOT NULL,
+    created_at  TIMESTAMP    NULL,
+    updated_at  TIMESTAMP    NULL,
+    deleted_at  TIMESTAMP    NULL,
+    archived_at TIMESTAMP    NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_comments_archive_post_id ON comments_archive (post_id);
+
+CREATE TABLE likes_archive (
+    id          INTEGER   NOT NULL,
+    user_id     INTEGER   NOT NULL,
+    post_id     INTEGER   NOT NULL,
+    created_at  TIMESTAMP NULL,
+    updated_at  TIMESTAMP NULL,
+    deleted_at  TIMESTAMP NULL,
+    archived_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_likes_archive_post_id ON likes_archive (post_id);
+
+CREATE TABLE views_archive (
+    id          INTEGER   NOT NULL,
+    user_id     INTEGER   NOT NULL,
+    post_id     INTEGER   NOT NULL,
+    created_at  TIMESTAMP NULL,
+    updated_at  TIMESTAMP NULL,
+    deleted_at  TIMESTAMP NULL,
+    archived_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_views_archive_post_id ON views_archive (post_id);
+
+-- 보관 대상 찾기: comments WHERE deleted_at < :cutoff
+CREATE INDEX ix_comments_deleted_at ON comments (deleted_at);
+
+-- 게시글과 함께 옮길 행 찾기: likes / views WHERE post_id IN (...)
+-- (기존 UNIQUE (user_id, post_id) 는 post_id 가 두 번째 컬럼이라 이 조회에 쓰이지 않는다)
+CREATE INDEX ix_likes_post_id ON likes (post_id);
+CREATE INDEX ix_views_post_id ON views (post_id);
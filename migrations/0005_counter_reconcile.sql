@@ -0,0 +1,16 @@
+-- 게시글 카운터(likes/comments/views_count) 재계산용.
+
+-- 증분 모드: 마지막 실행 이후 바뀐 게시글 찾기 (WHERE created_at >= :since)
+CREATE INDEX ix_likes_created_at ON likes (created_at);
+CREATE INDEX ix_views_created_at ON views (created_at);
+CREATE INDEX ix_comments_created_at ON comments (created_at);
+
+-- 작업별 마지막 성공 실행 시각
+CREATE TABLE counter_watermarks (
+    name        VARCHAR(64) NOT NULL,
+    last_run_at TIMESTAMP   NULL,
+    PRIMARY KEY (name)
+);
+
+-- delete_comment 가 comments_count 를 줄이지 않던 동안 생긴 차이는
+-- python scripts/reconcile_counters.py --full 로 맞춘다.
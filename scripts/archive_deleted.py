@@ -0,0 +1,113 @@
+"""보관 기간(--days)이 지난 soft delete 게시글/댓글을 *_archive 테이블로 옮기고 원래 테이블에서 지운다.
+
+게시글은 딸린 댓글/좋아요/조회 기록과 함께 옮긴다. 묶음(--batch) 하나가 트랜잭션 하나라서
+중간에 끊겨도 커밋된 묶음은 옮겨진 상태, 나머지는 원래 테이블에 그대로 남는다.
+다시 실행하면 남은 행부터 이어서 진행한다.
+
+탈퇴한 사용자(users.deleted_at)는 옮기지 않는다. 남아 있는 글/댓글이 작성자 정보를 JOIN 하기 때문이다.
+
+    python scripts/archive_deleted.py --days 30 --batch 200
+    python scripts/archive_deleted.py --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, text
+
+from app.db import engine
+from app.models.model import Base
+
+# 게시글과 함께 옮기는 테이블 (게시글 본문보다 먼저 옮긴다)
+POST_CHILDREN = ("comments", "likes", "views")
+
+
+def columns(table):
+    return ", ".join(column.name for column in Base.metadata.tables[table].columns)
+
+
+def move(conn, table, where, ids):
+    """table 에서 where 에 걸리는 행을 table_archive 로 복사한 뒤 지운다. 옮긴 행 수를 돌려준다."""
+    cols = columns(table)
+    ids_param = bindparam("ids", expanding=True)
+    copied = conn.execute(
+        text(f"INSERT INTO {table}_archive ({cols}) SELECT {cols} FROM {table} WHERE {where}").bindparams(ids_param),
+        {"ids": ids}).rowcount
+    deleted = conn.execute(text(f"DELETE FROM {table} WHERE {where}").bindparams(ids_param), {"ids": ids}).rowcount
+    if copied != deleted:
+        # 복사와 삭제 사이에 행이 바뀐 경우 - 이 묶음은 롤백하고 다음 실행에서 다시 시도한다.
+        raise RuntimeError(f"{table}: 복사 {copied}행 / 삭제 {deleted}행 불일치")
+    return deleted
+
+
+def archive_posts(conn, ids):
+    moved = {table: move(conn, table, "post_id IN :ids", ids) for table in POST_CHILDREN}
+    moved["posts"] = move(conn, "posts", "id IN :ids", ids)
+    return moved
+
+
+def archive_comments(conn, ids):
+    return {"comments": move(conn, "comments", "id IN :ids", ids)}
+
+
+# (이름, 대상 id 조회 SQL, 옮기는 함수). 게시글을 먼저 옮겨야 딸린 삭제 댓글이 게시글과 같이 움직인다.
+JOBS = [
+    ("posts", "SELECT id FROM posts WHERE deleted_at < :cutoff ORDER BY id LIMIT :limit", archive_posts),
+    ("comments", "SELECT id FROM comments WHERE deleted_at < :cutoff ORDER BY id LIMIT :limit", archive_comments),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=int(os.getenv("ARCHIVE_RETENTION_DAYS", "30")),
+                        help="삭제 후 이 기간이 지난 행만 옮긴다")
+    parser.add_argument("--batch", type=int, default=200, help="트랜잭션 하나에서 옮길 게시글/댓글 수")
+    parser.add_argument("--sleep", type=float, default=0.1, help="묶음 사이 대기(초) - 복제 지연/락 경합 완화")
+    parser.add_argument("--max-batches", type=int, default=0, help="0 이면 남은 행이 없을 때까지")
+    parser.add_argument("--dry-run", action="store_true", help="옮길 대상 수만 센다")
+    args = parser.parse_args()
+
+    cutoff = (datetime.now() - timedelta(days=args.days)).strftime("%Y-%m-%d %H:%M:%S")
+    print(f"cutoff: deleted_at < {cutoff}")
+
+    if args.dry_run:
+        with engine.connect() as conn:
+            for table in ("posts", "comments"):
+                count = conn.execute(text(f"SELECT COUNT(*) FROM {table} WHERE deleted_at < :cutoff"),
+                                     {"cutoff": cutoff}).scalar()
+                print(f"{table}: {count}행 보관 대상")
+        return
+
+    totals = {}
+    batches = 0
+    started = time.perf_counter()
+    for name, select_sql, archive in JOBS:
+        while not args.max_batches or batches < args.max_batches:
+            with engine.begin() as conn:
+                ids = [row.id for row in conn.execute(text(select_sql), {"cutoff": cutoff, "limit": args.batch})]
+                if not ids:
+                    break
+                moved = archive(conn, ids)
+            batches += 1
+            for table, count in moved.items():
+                totals[table] = totals.get(table, 0) + count
+            elapsed = time.perf_counter() - started
+            rows = sum(totals.values())
+            print(f"[{name} #{batches}] " + ", ".join(f"{t}={c}" for t, c in moved.items())
+                  + f"  total={rows} ({rows / elapsed:.0f} rows/s)")
+            if len(ids) < args.batch:
+                break
+            time.sleep(args.sleep)
+
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    print(f"moved {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s) "
+          + " ".join(f"{t}={c}" for t, c in sorted(totals.items())))
+
+
+if __name__ == "__main__":
+    main()
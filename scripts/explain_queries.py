@@ -0,0 +1,102 @@
+"""app/services 의 모든 SQL 문(text(...))에 EXPLAIN 을 실행해 풀 테이블 스캔이 있으면 실패한다.
+
+기본은 임시 SQLite DB 를 모델 스키마로 만들고 시드 데이터를 넣은 뒤 검사한다.
+마이그레이션을 적용한 MySQL 에서 검사하려면 --url 을 넘긴다 (데이터는 이미 있다고 가정).
+
+    python scripts/explain_queries.py
+    python scripts/explain_queries.py --url mysql+pymysql://user:pw@localhost/community
+"""
+import argparse
+import ast
+import glob
+import importlib
+import os
+import re
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+SAMPLE_PARAMS = {"limit": 10, "offset": 0}
+PARAM = re.compile(r"(?<!:):(\w+)")
+
+
+def collect_statements():
+    """각 모듈의 text(<expr>) 인자를 모듈 네임스페이스에서 평가해 SQL 문자열을 모은다."""
+    statements = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "app", "services", "*.py"))):
+        module_name = "app.services." + os.path.basename(path)[:-3]
+        module = importlib.import_module(module_name)
+        tree = ast.parse(open(path, encoding="utf-8").read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "text" and node.args:
+                location = f"{module_name}:{node.lineno}"
+                try:
+                    sql = eval(compile(ast.Expression(node.args[0]), path, "eval"), vars(module))
+                except NameError as e:
+                    # 지역 변수로 조립되는 SQL 은 검사할 수 없으므로 실패로 취급한다.
+                    statements.append((location, None, f"dynamic SQL ({e})"))
+                    continue
+                statements.append((location, " ".join(sql.split()), None))
+    return statements
+
+
+def full_scans(conn, dialect, sql):
+    from sqlalchemy import text
+
+    sql = re.sub(r"IN :(\w+)", r"IN (:\1)", sql)  # expanding 파라미터는 값 하나로 검사
+    params = {name: SAMPLE_PARAMS.get(name, 1) for name in PARAM.findall(sql)}
+    if dialect == "sqlite":
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+        scans = [r for r in rows if r.detail.startswith("SCAN ") and "CONSTANT ROW" not in r.detail]
+        # OFFSET 페이지네이션은 정렬 순서대로 offset+limit 행을 읽고 멈추는 게 본래 동작이다.
+        # 정렬(TEMP B-TREE) 없이 바깥 루프가 그 순서로 도는 스캔이면 풀 스캔으로 보지 않는다.
+        ordered = " OFFSET " in sql and not any("TEMP B-TREE" in r.detail for r in rows)
+        if ordered and scans and scans[0] is rows[0]:
+            scans = scans[1:]
+        return [r.detail for r in scans]
+    rows = conn.execute(text("EXPLAIN " + sql), params).mappings().fetchall()
+    return [f"{r['table']}: type=ALL" for r in rows if r["type"] == "ALL"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="검사할 DB URL (없으면 시드한 임시 SQLite)")
+    parser.add_argument("--posts", type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.url:
+        os.environ["DATABASE_URL"] = args.url
+    else:
+        from common import use_sqlite
+        use_sqlite(os.path.join(tempfile.gettempdir(), "explain_queries.db"))
+
+    from sqlalchemy import text
+    from app.db import engine
+
+    if not args.url:
+        from common import create_schema, seed
+        create_schema(engine)
+        seed(engine, users=200, posts=args.posts, comments=args.posts * 3, likes=args.posts * 2)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+    failures = 0
+    with engine.connect() as conn:
+        for location, sql, error in collect_statements():
+            problems = [error] if error else full_scans(conn, engine.dialect.name, sql)
+            conn.rollback()
+            status = "FULL SCAN" if problems else "ok"
+            failures += bool(problems)
+            print(f"[{status:>9}] {location}  {(sql or '')[:90]}")
+            for problem in problems:
+                print(f"{'':12}-> {problem}")
+
+    print(f"{failures} statement(s) with full table scans")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
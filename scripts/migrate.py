@@ -0,0 +1,102 @@
+"""migrations/*.sql 을 파일 이름(버전) 순서대로 한 번씩 적용한다.
+
+적용한 버전은 schema_migrations 테이블에 기록하므로 여러 번 실행해도 안전하다.
+마이그레이션 파일의 `-- check: SELECT ...` 줄은 적용 전에 실행하는 사전 점검이다. 결과 행이 하나라도 있으면
+(예: UNIQUE 인덱스를 막는 중복 데이터) 그 행들을 출력하고 아무 문장도 실행하지 않은 채 멈춘다.
+
+    python scripts/migrate.py            # 미적용 마이그레이션 적용
+    python scripts/migrate.py --status   # 적용 여부만 출력
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import text
+
+from app.db import engine
+
+MIGRATIONS_DIR = os.path.join(ROOT, "migrations")
+
+
+def split_statements(sql):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+CHECK_PREFIX = "-- check:"
+CHECK_REPORT_ROWS = 20
+
+
+def checks(sql):
+    return [line.strip()[len(CHECK_PREFIX):].strip() for line in sql.splitlines()
+            if line.strip().startswith(CHECK_PREFIX)]
+
+
+def failed_checks(conn, sql):
+    failures = []
+    for check in checks(sql):
+        rows = conn.execute(text(check)).fetchmany(CHECK_REPORT_ROWS + 1)
+        if rows:
+            failures.append((check, rows))
+    return failures
+
+
+def report(version, failures):
+    print(f"[blocked] {version}: 사전 점검 실패 - 파일 앞부분의 정리 방법을 따른 뒤 다시 실행하세요.")
+    for check, rows in failures:
+        print(f"          {check}")
+        for row in rows[:CHECK_REPORT_ROWS]:
+            print(f"            {tuple(row)}")
+        if len(rows) > CHECK_REPORT_ROWS:
+            print("            ...")
+
+
+def migration_files():
+    return sorted(name for name in os.listdir(MIGRATIONS_DIR) if name.endswith(".sql"))
+
+
+def applied_versions(conn):
+    conn.execute(text("""CREATE TABLE IF NOT EXISTS schema_migrations (
+                             version VARCHAR(255) PRIMARY KEY,
+                             applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                         )"""))
+    conn.commit()
+    return {row.version for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--status", action="store_true")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+        for name in migration_files():
+            version = name[:-len(".sql")]
+            if version in applied:
+                print(f"[applied] {version}")
+                continue
+            with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+                sql = f.read()
+            failures = failed_checks(conn, sql)
+            if failures:
+                report(version, failures)
+                if args.status:
+                    continue
+                sys.exit(1)
+            if args.status:
+                print(f"[pending] {version}")
+                continue
+            statements = split_statements(sql)
+            for stmt in statements:
+                conn.execute(text(stmt))
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {"v": version})
+            conn.commit()
+            print(f"[done]    {version} ({len(statements)} statements)")
+
+
+if __name__ == "__main__":
+    main()
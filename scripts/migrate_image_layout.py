@@ -0,0 +1,91 @@
+"""예전 평면 구조(/static/images/<uuid>_<name>, /static/images/<sha256>.<ext>)의 이미지를
+내용 해시 기반 샤딩 구조(/static/images/ab/cd/<sha256>.<ext>)로 옮기고
+users.image_url / posts.image_url 을 새 URL 로 바꾼다.
+
+프로젝트 루트에서 실행한다. 여러 번 실행해도 안전하다 (이미 옮긴 URL 은 건너뜀).
+
+    python scripts/migrate_image_layout.py [--dry-run]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.db import engine
+from app.services import images
+
+TABLES = ("users", "posts")
+
+
+def is_sharded(url):
+    rel = url[len(images.IMAGE_URL_PREFIX):]
+    parts = rel.split("/")
+    return len(parts) == 3 and images.HASHED_NAME.match(parts[2]) is not None
+
+
+def migrate_file(url, dry_run):
+    """파일을 샤딩 경로로 옮기고 새 URL 을 돌려준다. 파일이 없으면 None."""
+    name = url[len(images.IMAGE_URL_PREFIX):]
+    src = os.path.join(images.IMAGE_DIR, name)
+    match = images.HASHED_NAME.match(name)
+    ext = os.path.splitext(name)[1].lower()
+
+    if os.path.exists(src):
+        digest = match.group(1) if match else images.file_digest(src)
+    elif match:
+        digest = match.group(1)  # 이전 실행에서 파일은 이미 옮겨졌고 DB 갱신만 남은 경우
+    else:
+        return None
+
+    relpath = images.image_relpath(digest, ".jpg" if ext == ".jpeg" else ext)
+    dst = os.path.join(images.IMAGE_DIR, relpath)
+    if not dry_run:
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if os.path.exists(src):
+            if os.path.exists(dst):
+                os.remove(src)
+            else:
+                os.replace(src, dst)
+        old_thumb = images.thumbnail_path(src)
+        if os.path.exists(old_thumb):
+            os.replace(old_thumb, images.thumbnail_path(dst))
+        if os.path.exists(dst) and not os.path.exists(images.thumbnail_path(dst)):
+            images.make_thumbnail(dst, images.thumbnail_path(dst), images.THUMBNAIL_SIZE)
+    return images.IMAGE_URL_PREFIX + relpath
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        urls = set()
+        for table in TABLES:
+            rows = conn.execute(text(f"SELECT DISTINCT image_url FROM {table} WHERE image_url LIKE :prefix"),
+                                {"prefix": images.IMAGE_URL_PREFIX + "%"})
+            urls.update(row.image_url for row in rows if not is_sharded(row.image_url))
+
+        moved = missing = 0
+        for url in sorted(urls):
+            new_url = migrate_file(url, args.dry_run)
+            if new_url is None:
+                missing += 1
+                print(f"missing file, skipped: {url}")
+                continue
+            moved += 1
+            print(f"{url} -> {new_url}")
+            if not args.dry_run:
+                for table in TABLES:
+                    conn.execute(text(f"UPDATE {table} SET image_url = :new WHERE image_url = :old"),
+                                 {"new": new_url, "old": url})
+                conn.commit()
+
+    print(f"done: {moved} moved, {missing} missing{' (dry run)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
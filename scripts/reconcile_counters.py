@@ -0,0 +1,143 @@
+"""posts.likes_count / comments_count / views_count 를 실제 행 개수로 다시 맞춘다.
+
+게시글 id 구간(또는 id 묶음)마다 likes / comments / views 를 post_id 로 GROUP BY 해 세고,
+값이 다른 행만 UPDATE 한다. UPDATE 는 "읽은 값이 그대로일 때만" 바꾸므로 (WHERE likes_count = :old)
+집계와 UPDATE 사이에 들어온 좋아요/댓글이 덮어써지지 않는다. 그런 행은 다음 실행에서 맞춰진다.
+
+    python scripts/reconcile_counters.py --full            # 전체 게시글
+    python scripts/reconcile_counters.py                   # 지난 실행 이후 좋아요/조회/댓글이 생긴 게시글만
+    python scripts/reconcile_counters.py --full --dry-run  # 차이만 출력
+
+증분 모드는 created_at(댓글은 deleted_at 도)으로 바뀐 게시글을 찾으므로 좋아요 취소(행 삭제)는 잡지 못한다.
+좋아요 토글은 한 트랜잭션에서 행과 카운터를 같이 바꾸므로 평소에는 문제 없고, 전체 모드를 가끔 돌려 보정한다.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, text
+
+from app.db import engine
+
+WATERMARK = "post_counters"
+# 진행 중이던 트랜잭션이 워터마크보다 이른 시각으로 커밋될 수 있으므로 조금 겹쳐서 본다.
+OVERLAP_SECONDS = 300
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# (카운터 컬럼, 실제 개수 SQL). {cond} 에는 post_id 조건이 들어간다.
+COUNTERS = [
+    ("likes_count", "SELECT post_id, COUNT(*) AS n FROM likes WHERE {cond} GROUP BY post_id"),
+    ("comments_count",
+     "SELECT post_id, COUNT(*) AS n FROM comments WHERE {cond} AND deleted_at IS NULL GROUP BY post_id"),
+    ("views_count", "SELECT post_id, COUNT(*) AS n FROM views WHERE {cond} GROUP BY post_id"),
+]
+
+# 증분 모드: since 이후 바뀐 게시글 id
+TOUCHED_SQL = [
+    "SELECT DISTINCT post_id FROM likes WHERE created_at >= :since",
+    "SELECT DISTINCT post_id FROM views WHERE created_at >= :since",
+    "SELECT DISTINCT post_id FROM comments WHERE created_at >= :since",
+    "SELECT DISTINCT post_id FROM comments WHERE deleted_at >= :since",
+]
+
+
+def statement(sql):
+    stmt = text(sql)
+    # 증분 모드의 IN :ids 는 expanding 파라미터로 넘긴다.
+    return stmt.bindparams(bindparam("ids", expanding=True)) if ":ids" in sql else stmt
+
+
+def reconcile(conn, cond, params, dry_run):
+    """cond 에 걸리는 게시글의 카운터를 맞추고 (검사한 게시글 수, {컬럼: 고친 행 수}) 를 돌려준다."""
+    posts = conn.execute(statement("SELECT id, likes_count, comments_count, views_count FROM posts WHERE "
+                                   + cond.format(col="id")), params).fetchall()
+    fixed = {}
+    for column, count_sql in COUNTERS:
+        actual = dict(conn.execute(statement(count_sql.format(cond=cond.format(col="post_id"))), params).fetchall())
+        diffs = [{"id": p.id, "old": getattr(p, column), "new": actual.get(p.id, 0)}
+                 for p in posts if getattr(p, column) != actual.get(p.id, 0)]
+        if dry_run:
+            for d in diffs:
+                print(f"  post {d['id']}: {column} {d['old']} -> {d['new']}")
+        elif diffs:
+            conn.execute(text(f"UPDATE posts SET {column} = :new WHERE id = :id AND {column} = :old"), diffs)
+        fixed[column] = len(diffs)
+    return len(posts), fixed
+
+
+def id_ranges(conn, chunk):
+    lo, hi = conn.execute(text("SELECT MIN(id), MAX(id) FROM posts")).fetchone()
+    if lo is None:
+        return []
+    return [("{col} BETWEEN :lo AND :hi", {"lo": start, "hi": start + chunk - 1})
+            for start in range(lo, hi + 1, chunk)]
+
+
+def touched_batches(conn, since, chunk):
+    touched = set()
+    for sql in TOUCHED_SQL:
+        touched.update(row.post_id for row in conn.execute(text(sql), {"since": since}))
+    print(f"{len(touched)} posts touched since {since}")
+    ids = sorted(touched)
+    return [("{col} IN :ids", {"ids": ids[start:start + chunk]}) for start in range(0, len(ids), chunk)]
+
+
+def as_datetime(value):
+    # SQLite 는 TIMESTAMP 를 문자열로 돌려준다.
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def load_watermark(conn):
+    return conn.execute(text("SELECT last_run_at FROM counter_watermarks WHERE name = :name"),
+                        {"name": WATERMARK}).scalar()
+
+
+def save_watermark(conn, run_started):
+    params = {"name": WATERMARK, "at": run_started}
+    if not conn.execute(text("UPDATE counter_watermarks SET last_run_at = :at WHERE name = :name"), params).rowcount:
+        conn.execute(text("INSERT INTO counter_watermarks (name, last_run_at) VALUES (:name, :at)"), params)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="워터마크와 상관없이 전체 게시글을 검사")
+    parser.add_argument("--chunk", type=int, default=1000, help="한 트랜잭션에서 검사할 게시글 수")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        run_started = as_datetime(conn.execute(text("SELECT NOW()")).scalar()).strftime(TIME_FORMAT)
+        watermark = None if args.full else load_watermark(conn)
+        if watermark is None:
+            print("full scan")
+            batches = id_ranges(conn, args.chunk)
+        else:
+            since = (as_datetime(watermark) - timedelta(seconds=OVERLAP_SECONDS)).strftime(TIME_FORMAT)
+            batches = touched_batches(conn, since, args.chunk)
+        conn.commit()
+
+        checked = 0
+        totals = {column: 0 for column, _ in COUNTERS}
+        for cond, params in batches:
+            n, fixed = reconcile(conn, cond, params, args.dry_run)
+            conn.commit()
+            checked += n
+            for column, count in fixed.items():
+                totals[column] += count
+
+        if not args.dry_run:
+            save_watermark(conn, run_started)
+            conn.commit()
+
+    elapsed = time.perf_counter() - started
+    print(f"checked {checked} posts in {len(batches)} chunk(s), {elapsed:.2f}s; "
+          + ("would fix " if args.dry_run else "fixed ") + " ".join(f"{c}={n}" for c, n in totals.items()))
+
+
+if __name__ == "__main__":
+    main()